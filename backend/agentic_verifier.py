@@ -1,15 +1,28 @@
 import os
+import re
 import json
+import time
 import asyncio
 from decouple import config
-from groq import AsyncGroq  # The Brain (Llama 3.3)
+from groq import AsyncGroq, APITimeoutError  # The Brain (Llama 3.3)
 from tavily import TavilyClient # The Eyes (Search)
 from pydantic import BaseModel, Field, ValidationError
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional, Tuple
+from shared_cache import shared_cache, normalize_key
+from deadlines import Deadline, stage_timeout
+from prefetch import PREFETCH_ENABLED, find_prefetched_evidence
+from claim_segmentation import normalize_text, segment_claims
+from fingerprint import fingerprint_article, lookup_claims, store_claims
+from upstream import groq_breaker, tavily_breaker, run_blocking, CircuitOpenError, ExecutorSaturatedError
+from json_stream import IncrementalJSONObject
 
 # --- CONFIGURATION ---
 MODEL_NAME = "llama-3.3-70b-versatile" # Fast, Free, Smart
 
+# Hard per-call limits (seconds). A request deadline can only shorten these.
+SEARCH_TIMEOUT = 10.0
+LLM_TIMEOUT = 30.0
+
 INDIA_AUTHORITY_DOMAINS = [
     # 1. Fact Checkers (For debunking)
     "altnews.in", "boomlive.in", "thequint.com", "factly.in", "vishvasnews.com",
@@ -36,6 +49,38 @@ class VerificationResult(BaseModel):
     confidence_score: float = Field(description="0.0 to 1.0 confidence.")
     explanation: str = Field(description="Concise proof summary.")
     sources: List[str] = Field(description="List of supporting URLs.")
+    timed_out: bool = Field(default=False, description="True if the deadline cut the analysis short.")
+
+class SubClaimResult(VerificationResult):
+    claim_text: str = Field(description="One sentence-level claim from the highlight.")
+
+class AggregateVerificationResult(VerificationResult):
+    claims: List[SubClaimResult] = Field(default_factory=list, description="Per-claim details.")
+
+# Worst verdict wins: one FALSE sentence makes the highlight FALSE.
+VERDICT_SEVERITY = ["FALSE", "MISLEADING", "UNVERIFIED", "VERIFIED", "ERROR"]
+
+# --- STREAMING METRICS (per process) ---
+# Time-to-verdict (first useful byte for the UI) is tracked apart from total time.
+_stream_timings = {"streams": 0, "verdicts": 0, "time_to_verdict_ms": 0.0, "total_ms": 0.0}
+
+def _record_stream_timing(timing: dict):
+    _stream_timings["streams"] += 1
+    _stream_timings["total_ms"] += timing["total_ms"]
+    if "time_to_verdict_ms" in timing:
+        _stream_timings["verdicts"] += 1
+        _stream_timings["time_to_verdict_ms"] += timing["time_to_verdict_ms"]
+
+def stream_stats() -> dict:
+    streams, verdicts = _stream_timings["streams"], _stream_timings["verdicts"]
+    return {
+        "streams": streams,
+        "avg_time_to_verdict_ms": round(_stream_timings["time_to_verdict_ms"] / verdicts, 1) if verdicts else 0.0,
+        "avg_total_ms": round(_stream_timings["total_ms"] / streams, 1) if streams else 0.0,
+    }
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.monotonic() - started) * 1000, 1)
 
 # --- THE AGENT CLASS ---
 class AgenticVerifier:
@@ -57,15 +102,26 @@ class AgenticVerifier:
     # ------------------------------------------------------------------
     # TIER 3: EXTRACT CLAIMS (Restored Logic)
     # ------------------------------------------------------------------
-    async def isolate_claims(self, article_content: str) -> List[str]:
+    async def isolate_claims(self, article_content: str, deadline: Optional[Deadline] = None) -> List[str]:
         """
         Scans a full article and extracts 3-5 verifiable factual claims.
+        Raises asyncio.TimeoutError if the LLM call times out, so the caller
+        can report a timeout instead of "no claims found".
         """
         if not self.llm_client: return []
+        if deadline and deadline.expired: return []
 
         # Limit text to 15k chars to prevent "heavy" processing
         shortened_text = article_content[:15000]
 
+        # Syndicated/mirrored copies of the same story reuse earlier extractions.
+        fingerprint, sample = fingerprint_article(shortened_text)
+        # The near-duplicate scan reads up to NEAR_SCAN_LIMIT rows; keep it off the loop.
+        cached = await asyncio.to_thread(lookup_claims, fingerprint, sample)
+        if cached is not None:
+            print("⚡ Claim cache hit.")
+            return cached
+
         system_instruction = (
             "You are an expert data extraction agent. "
             "Extract 3-5 distinct, verifiable factual claims from the text. "
@@ -87,22 +143,35 @@ class AgenticVerifier:
 
         try:
             # ⭐ CRITICAL CHANGE: Using the FAST MODEL here
-            response = await self.llm_client.chat.completions.create(
-                model=self.fast_model,  # <--- Using 8b-instant
-                messages=[
-                    {"role": "system", "content": system_instruction},
-                    {"role": "user", "content": prompt}
-                ],
-                response_format={"type": "json_object"}, 
-                temperature=0.1 # Low temp for speed
-            )
+            llm_timeout = stage_timeout(deadline, 1.0, LLM_TIMEOUT)
+            response = await groq_breaker.call(lambda: asyncio.wait_for(
+                self.llm_client.chat.completions.create(
+                    model=self.fast_model,  # <--- Using 8b-instant
+                    messages=[
+                        {"role": "system", "content": system_instruction},
+                        {"role": "user", "content": prompt}
+                    ],
+                    response_format={"type": "json_object"}, 
+                    temperature=0.1, # Low temp for speed
+                    timeout=llm_timeout
+                ),
+                timeout=llm_timeout
+            ), timeout=llm_timeout)
             
             # Parse & Validate
             raw_json = json.loads(response.choices[0].message.content)
             validated_data = ClaimList(**raw_json) 
             
-            return [c.claim_text for c in validated_data.claims]
+            claims = [c.claim_text for c in validated_data.claims]
+            store_claims(fingerprint, sample, claims)
+            return claims
 
+        except CircuitOpenError:
+            print("🔌 Groq circuit open. Skipping extraction.")
+            return []
+        except (asyncio.TimeoutError, APITimeoutError) as e:
+            print("⏱️ Extraction timed out.")
+            raise asyncio.TimeoutError() from e
         except Exception as e:
             print(f"⚠️ Extraction Failed: {e}")
             return []
@@ -110,43 +179,233 @@ class AgenticVerifier:
     # ------------------------------------------------------------------
     # INTERNAL: SEARCH TOOL (The "Eyes")
     # ------------------------------------------------------------------
-    async def _perform_search(self, query: str) -> str:
+    async def _perform_search(self, query: str, timeout: float = SEARCH_TIMEOUT, check_cache: bool = True) -> str:
+        # check_cache=False: the caller already looked this exact query up (one read, one counted miss).
+        cached = shared_cache.get("evidence", normalize_key(query)) if check_cache else None
+        if cached is not None:
+            print(f"⚡ Evidence cache hit: {query}")
+            return cached
+
         try:
             print(f"🔎 Searching: {query}")
-            response = await asyncio.to_thread(
-                self.search_client.search,
-                query=query,
-                search_depth="basic",
-                include_domains=INDIA_AUTHORITY_DOMAINS, # Hard Filter
-                max_results=5
-            )
+            # The thread itself can't be cancelled, so Tavily gets the same timeout.
+            # Blocking SDK call runs on the bounded upstream pool, not the default executor.
+            response = await tavily_breaker.call(lambda: asyncio.wait_for(
+                run_blocking(
+                    self.search_client.search,
+                    query=query,
+                    search_depth="basic",
+                    include_domains=INDIA_AUTHORITY_DOMAINS, # Hard Filter
+                    max_results=5,
+                    timeout=timeout
+                ),
+                timeout=timeout
+            ), timeout=timeout)
             
             context = []
             for result in response.get('results', []):
                 context.append(f"Source: {result['url']}\nContent: {result['content']}\n")
             
-            return "\n".join(context) if context else ""
+            evidence = "\n".join(context) if context else ""
+            # Only cache real evidence; an empty result should be retried later.
+            if evidence:
+                shared_cache.set("evidence", normalize_key(query), evidence)
+            return evidence
+        except asyncio.TimeoutError:
+            print(f"⏱️ Search timed out after {timeout:.1f}s")
+            return ""
+        except (CircuitOpenError, ExecutorSaturatedError) as e:
+            # Fast-fail: the verdict step reasons with "No direct evidence found."
+            print(f"🔌 Search skipped: {e}")
+            return ""
         except Exception as e:
             print(f"⚠️ Search Error: {e}")
             return ""
 
+    # ------------------------------------------------------------------
+    # INTERNAL: PARTIAL ANSWER WHEN THE DEADLINE RUNS OUT
+    # ------------------------------------------------------------------
+    def _timed_out_result(self, evidence: str) -> dict:
+        sources = re.findall(r"^Source: (\S+)", evidence or "", flags=re.MULTILINE)
+        explanation = (
+            "Time limit reached before the analysis finished. Evidence found so far is listed in sources."
+            if sources else
+            "Time limit reached before any evidence was found."
+        )
+        return VerificationResult(
+            verdict="UNVERIFIED",
+            confidence_score=0.0,
+            explanation=explanation,
+            sources=sources,
+            timed_out=True
+        ).model_dump()
+
+    def _unavailable_result(self) -> dict:
+        return VerificationResult(
+            verdict="UNVERIFIED",
+            confidence_score=0.0,
+            explanation="Verification service is temporarily unavailable. Please try again shortly.",
+            sources=[]
+        ).model_dump()
+
+    # ------------------------------------------------------------------
+    # TIER 2: VERIFY HIGHLIGHT (Segment -> Verify in parallel -> Aggregate)
+    # ------------------------------------------------------------------
+    async def verify_text_agentic(self, text: str, deadline: Optional[Deadline] = None) -> dict:
+        """
+        Normalizes a highlighted selection, splits it into sentence-level
+        claims and verifies them concurrently (so latency ~ slowest claim).
+        A single-sentence highlight returns the plain verify_claim_agentic result.
+        """
+        claims = segment_claims(normalize_text(text))
+        if len(claims) <= 1:
+            return await self.verify_claim_agentic(claims[0] if claims else text, deadline=deadline)
+
+        print(f"✂️ Split highlight into {len(claims)} claims.")
+        results = await asyncio.gather(
+            *(self.verify_claim_agentic(claim, deadline=deadline) for claim in claims)
+        )
+        return self._aggregate(claims, results)
+
+    def _aggregate(self, claims: List[str], results: List[dict]) -> dict:
+        details = [SubClaimResult(claim_text=claim, **result) for claim, result in zip(claims, results)]
+
+        ranked = [d.verdict if d.verdict in VERDICT_SEVERITY else "UNVERIFIED" for d in details]
+        checked = [v for v in ranked if v != "ERROR"]
+        if not checked:
+            verdict = "ERROR"
+        elif all(v == "VERIFIED" for v in checked):
+            verdict = "VERIFIED"
+        else:
+            # Mixed VERIFIED/UNVERIFIED can't be VERIFIED as a whole.
+            verdict = min(checked, key=VERDICT_SEVERITY.index)
+            verdict = "UNVERIFIED" if verdict == "VERIFIED" else verdict
+
+        deciding = [d for d in details if d.verdict == verdict] or details
+        confidence = sum(d.confidence_score for d in deciding) / len(deciding)
+
+        verified = sum(1 for v in ranked if v == "VERIFIED")
+        explanation = f"{verified} of {len(details)} claims verified. {deciding[0].explanation}"
+
+        sources: List[str] = []
+        for d in details:
+            sources.extend(url for url in d.sources if url not in sources)
+
+        return AggregateVerificationResult(
+            verdict=verdict,
+            confidence_score=round(confidence, 3),
+            explanation=explanation,
+            sources=sources,
+            timed_out=any(d.timed_out for d in details),
+            claims=details
+        ).model_dump()
+
     # ------------------------------------------------------------------
     # TIER 2: VERIFY CLAIM (The "Brain")
     # ------------------------------------------------------------------
-    async def verify_claim_agentic(self, claim_text: str) -> dict:
+    async def verify_claim_agentic(self, claim_text: str, deadline: Optional[Deadline] = None) -> dict:
         if not self.llm_client:
-            return VerificationResult(verdict="ERROR", confidence_score=0.0, explanation="Offline", sources=[]).dict()
+            return VerificationResult(verdict="ERROR", confidence_score=0.0, explanation="Offline", sources=[]).model_dump()
+
+        # 0. Shared cache (visible to every worker process)
+        cache_key = normalize_key(claim_text)
+        cached = shared_cache.get("verdict", cache_key)
+        if cached is not None:
+            print("⚡ Verdict cache hit.")
+            return cached
+
+        # Groq is down: don't spend Tavily calls on a verdict we can't produce.
+        if groq_breaker.is_open:
+            return self._unavailable_result()
+
+        # 1-2. Search (with self-correction retry)
+        evidence, prefetched = await self._gather_evidence(claim_text, deadline)
+        if deadline and deadline.expired:
+            return self._timed_out_result(evidence)
+
+        # 3. Reasoning with Groq
+        try:
+            # 3b. The LLM gets whatever is left of the budget.
+            llm_timeout = stage_timeout(deadline, 1.0, LLM_TIMEOUT)
+            response = await groq_breaker.call(lambda: asyncio.wait_for(
+                self.llm_client.chat.completions.create(
+                    model=MODEL_NAME,
+                    messages=self._verdict_messages(claim_text, evidence),
+                    response_format={"type": "json_object"},
+                    temperature=0.0,
+                    timeout=llm_timeout
+                ),
+                timeout=llm_timeout
+            ), timeout=llm_timeout)
+
+            raw_json = json.loads(response.choices[0].message.content)
+            
+            # Pydantic Validation ensures safe output for your Frontend
+            # Dump once: the same plain dict is cached and handed to the response.
+            result = VerificationResult.model_validate(raw_json).model_dump()
+            # A verdict reasoned from a related query's evidence isn't this claim's to cache.
+            if not prefetched:
+                shared_cache.set("verdict", cache_key, result)
+            return result
+
+        except (asyncio.TimeoutError, APITimeoutError):
+            print("⏱️ Verification timed out. Returning partial result.")
+            return self._timed_out_result(evidence)
+        except CircuitOpenError:
+            print("🔌 Groq circuit open. Returning fast-fail result.")
+            return self._unavailable_result()
+        except ValidationError as e:
+            print(f"⚠️ Validation Error: {e}")
+            return {
+                "verdict": "UNVERIFIED", 
+                "confidence_score": 0.0,
+                "explanation": "AI output format invalid.", 
+                "sources": []
+            }
+        except Exception as e:
+            print(f"⚠️ Verification Failed: {e}")
+            return {
+                "verdict": "UNVERIFIED", 
+                "confidence_score": 0.0,
+                "explanation": "Analysis failed.", 
+                "sources": []
+            }
 
-        # 1. First Search Attempt
-        evidence = await self._perform_search(claim_text)
+    # ------------------------------------------------------------------
+    # INTERNAL: EVIDENCE + PROMPT (shared by the blocking and streaming paths)
+    # ------------------------------------------------------------------
+    async def _gather_evidence(self, claim_text: str, deadline: Optional[Deadline]) -> Tuple[str, bool]:
+        """
+        Returns (evidence, prefetched); `prefetched` is True when the evidence
+        came from a related Tier-1 query rather than a search for this claim.
+        """
+        # 1. Evidence already searched for this exact claim beats anything fuzzier.
+        evidence = shared_cache.get("evidence", normalize_key(claim_text))
+        if evidence:
+            print(f"⚡ Evidence cache hit: {claim_text}")
+
+        # 1b. Evidence prefetched from a related Tier-1 search skips the round trip.
+        if not evidence and PREFETCH_ENABLED:
+            evidence = find_prefetched_evidence(claim_text)
+            if evidence:
+                return evidence, True
+
+        # 1c. First Search Attempt (at most a third of the budget)
+        if not evidence:
+            evidence = await self._perform_search(
+                claim_text, stage_timeout(deadline, 0.35, SEARCH_TIMEOUT), check_cache=False
+            )
 
         # 2. Self-Correction Loop (Simple Agentic Behavior)
         # If no evidence found, try a broader keyword search
-        if not evidence:
+        if not evidence and not (deadline and deadline.expired):
             print("🔄 Evidence weak. Retrying with 'Fact Check' keywords...")
-            evidence = await self._perform_search(f"fact check {claim_text} official data")
+            evidence = await self._perform_search(
+                f"fact check {claim_text} official data", stage_timeout(deadline, 0.5, SEARCH_TIMEOUT)
+            )
+        return evidence, False
 
-        # 3. Reasoning with Groq
+    def _verdict_messages(self, claim_text: str, evidence: str) -> List[dict]:
         system_instruction = (
             "You are Credible, a strict fact-checking AI. "
             "Compare the Claim vs Evidence. "
@@ -175,36 +434,176 @@ class AgenticVerifier:
         }}
         """
 
+        return [
+            {"role": "system", "content": system_instruction},
+            {"role": "user", "content": prompt}
+        ]
+
+    # ------------------------------------------------------------------
+    # TIER 2 (STREAMING): VERDICT FIRST, THEN EXPLANATION AS IT IS WRITTEN
+    # ------------------------------------------------------------------
+    async def verify_text_stream(self, text: str, deadline: Optional[Deadline] = None) -> AsyncIterator[dict]:
+        """
+        Streaming counterpart of verify_text_agentic. Yields events:
+          {"event": "verdict", verdict, confidence_score, time_to_verdict_ms}
+          {"event": "explanation", "delta": "..."}
+          {"event": "sources", "sources": [...]}
+          {"event": "claims", "claims": [...]}    (multi-sentence highlights: the split)
+          {"event": "claim", claim_text, ...}      (each sub-claim as it finishes)
+          {"event": "result", ...VerificationResult..., "timing": {...}}  (always last)
+        """
+        started = time.monotonic()
+        claims = segment_claims(normalize_text(text))
+        if len(claims) <= 1:
+            async for event in self._verify_claim_stream(claims[0] if claims else text, deadline, started):
+                yield event
+            return
+
+        # Several claims: stream each sub-verdict as soon as it's ready, then the aggregate.
+        print(f"✂️ Split highlight into {len(claims)} claims (streaming).")
+        async def indexed(i: int, claim: str):
+            return i, await self.verify_claim_agentic(claim, deadline=deadline)
+
+        yield {"event": "claims", "claims": claims}
+        tasks = [asyncio.ensure_future(indexed(i, claim)) for i, claim in enumerate(claims)]
+        results: List[Optional[dict]] = [None] * len(claims)
+        timing = {}
         try:
-            response = await self.llm_client.chat.completions.create(
-                model=MODEL_NAME,
-                messages=[
-                    {"role": "system", "content": system_instruction},
-                    {"role": "user", "content": prompt}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.0
-            )
+            for next_done in asyncio.as_completed(tasks):
+                i, result = await next_done
+                results[i] = result
+                if "time_to_verdict_ms" not in timing:
+                    timing["time_to_verdict_ms"] = _elapsed_ms(started)
+                yield {"event": "claim", "claim_text": claims[i], **result}
+        finally:
+            for task in tasks:
+                task.cancel()
 
-            raw_json = json.loads(response.choices[0].message.content)
-            
-            # Pydantic Validation ensures safe output for your Frontend
-            result = VerificationResult(**raw_json)
-            return result.dict()
+        timing["total_ms"] = _elapsed_ms(started)
+        _record_stream_timing(timing)
+        yield {"event": "result", **self._aggregate(claims, results), "timing": timing}
 
-        except ValidationError as e:
+    async def _verify_claim_stream(self, claim_text: str, deadline: Optional[Deadline], started: float) -> AsyncIterator[dict]:
+        timing = {}
+
+        def finish(result: dict) -> dict:
+            timing["total_ms"] = _elapsed_ms(started)
+            _record_stream_timing(timing)
+            return {"event": "result", **result, "timing": timing}
+
+        if not self.llm_client:
+            yield finish(VerificationResult(verdict="ERROR", confidence_score=0.0, explanation="Offline", sources=[]).model_dump())
+            return
+
+        cache_key = normalize_key(claim_text)
+        cached = shared_cache.get("verdict", cache_key)
+        if cached is not None:
+            timing["time_to_verdict_ms"] = _elapsed_ms(started)
+            yield {"event": "verdict", "verdict": cached["verdict"], "confidence_score": cached["confidence_score"],
+                   "time_to_verdict_ms": timing["time_to_verdict_ms"]}
+            yield finish(cached)
+            return
+
+        if groq_breaker.is_open:
+            yield finish(self._unavailable_result())
+            return
+
+        evidence, prefetched = await self._gather_evidence(claim_text, deadline)
+        if deadline and deadline.expired:
+            yield finish(self._timed_out_result(evidence))
+            return
+
+        parser = IncrementalJSONObject()
+        fields = {}
+        stream = None
+        llm_timeout = stage_timeout(deadline, 1.0, LLM_TIMEOUT)
+        # The breaker judges the whole generation (opening the stream and every
+        # chunk), not just the headers. Time spent handing events to the client
+        # isn't Groq's, so only the waits on Groq are counted.
+        upstream_seconds = 0.0
+        try:
+            if not groq_breaker.allow():
+                raise CircuitOpenError("groq circuit is open")
+            try:
+                expires = time.monotonic() + llm_timeout
+                waited = time.monotonic()
+                try:
+                    # No response_format here: Groq's JSON mode doesn't stream, so the
+                    # prompt asks for JSON and the parser skips anything before "{".
+                    stream = await asyncio.wait_for(
+                        self.llm_client.chat.completions.create(
+                            model=MODEL_NAME,
+                            messages=self._verdict_messages(claim_text, evidence),
+                            temperature=0.0,
+                            stream=True,
+                            timeout=llm_timeout
+                        ),
+                        timeout=llm_timeout
+                    )
+                finally:
+                    upstream_seconds += time.monotonic() - waited
+
+                chunks = stream.__aiter__()
+                while not parser.done:
+                    waited = time.monotonic()
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), max(0.0, expires - time.monotonic()))
+                    except StopAsyncIteration:
+                        break
+                    finally:
+                        upstream_seconds += time.monotonic() - waited
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if not delta:
+                        continue
+
+                    for kind, key, value in parser.feed(delta):
+                        if kind == "partial":
+                            if key == "explanation":
+                                yield {"event": "explanation", "delta": value}
+                            continue
+                        fields[key] = value
+                        if key == "sources":
+                            yield {"event": "sources", "sources": value}
+                        elif "time_to_verdict_ms" not in timing and "verdict" in fields and "confidence_score" in fields:
+                            timing["time_to_verdict_ms"] = _elapsed_ms(started)
+                            yield {"event": "verdict", "verdict": fields["verdict"],
+                                   "confidence_score": fields["confidence_score"],
+                                   "time_to_verdict_ms": timing["time_to_verdict_ms"]}
+            except BaseException as e:
+                # Mid-stream stalls and errors count; a client disconnect doesn't.
+                groq_breaker.record_outcome(e, upstream_seconds, llm_timeout)
+                raise
+            groq_breaker.record_outcome(None, upstream_seconds, llm_timeout)
+
+            # The streamed pieces were best-effort; the final object is validated as usual.
+            raw_json = json.loads(parser.text(), strict=False)
+            result = VerificationResult.model_validate(raw_json).model_dump()
+            if not prefetched:
+                shared_cache.set("verdict", cache_key, result)
+
+        except (asyncio.TimeoutError, APITimeoutError):
+            print("⏱️ Streaming verification timed out. Returning partial result.")
+            result = self._timed_out_result(evidence)
+        except CircuitOpenError:
+            result = self._unavailable_result()
+        except (ValidationError, json.JSONDecodeError) as e:
             print(f"⚠️ Validation Error: {e}")
-            return {
+            result = {
                 "verdict": "UNVERIFIED", 
                 "confidence_score": 0.0,
                 "explanation": "AI output format invalid.", 
                 "sources": []
             }
         except Exception as e:
-            print(f"⚠️ Verification Failed: {e}")
-            return {
+            print(f"⚠️ Streaming Verification Failed: {e}")
+            result = {
                 "verdict": "UNVERIFIED", 
                 "confidence_score": 0.0,
                 "explanation": "Analysis failed.", 
                 "sources": []
-            }
\ No newline at end of file
+            }
+        finally:
+            if stream is not None:
+                await stream.close()
+
+        yield finish(result)
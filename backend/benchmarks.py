@@ -0,0 +1,402 @@
+"""
+Offline benchmarks for the Credible backend.
+
+Nothing here touches Groq, Tavily or ScraperAPI: upstream calls are replaced by
+stand-ins with fixed latency so numbers are reproducible on a laptop.
+`workers` runs the real app under uvicorn (1..N workers) and drives it over HTTP.
+
+Usage:
+    python benchmarks.py workers --max-workers 4 --hit-ratio 0.7
+    python benchmarks.py serialization
+    python benchmarks.py fingerprint
+    python benchmarks.py stream --tokens-per-second 250
+"""
+import os
+import sys
+import json
+import time
+import types
+import random
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+# Stand-in credentials so the service modules import without a .env file.
+# CACHE_PATH/JOBS_PATH are pointed at a temporary directory by main().
+os.environ.setdefault("GROQ_API_KEY", "offline")
+os.environ.setdefault("TAVILY_API_KEY", "offline")
+os.environ.setdefault("SCRAPING_API_KEY", "offline")
+
+# --- OFFLINE STAND-INS ---
+UPSTREAM_LATENCY = 0.05  # Seconds a real Tavily/Groq round trip would cost (scaled down)
+STANDIN_VERDICT = json.dumps({
+    "verdict": "VERIFIED",
+    "confidence_score": 0.9,
+    "explanation": "Stand-in verdict. " * 20,
+    "sources": ["https://pib.gov.in/factcheck"],
+})
+
+
+class _StandinSearch:
+    """Blocking, like TavilyClient.search."""
+
+    def search(self, **kwargs):
+        time.sleep(UPSTREAM_LATENCY)
+        return {"results": [
+            {"url": f"https://pib.gov.in/release/{i}", "content": f"Official data on {kwargs['query']}. " * 10}
+            for i in range(5)
+        ]}
+
+
+STANDIN_TOKENS_PER_SECOND = 250.0  # Generation rate of the streaming stand-in
+
+
+class _StandinTokenStream:
+    """Like groq's AsyncStream: ~4 characters per chunk at the generation rate."""
+
+    def __init__(self, text: str):
+        self.pending = [text[i:i + 4] for i in range(0, len(text), 4)]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.pending:
+            raise StopAsyncIteration
+        await asyncio.sleep(1 / STANDIN_TOKENS_PER_SECOND)
+        delta = types.SimpleNamespace(content=self.pending.pop(0))
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta)])
+
+    async def close(self):
+        pass
+
+
+async def _standin_completion(stream: bool = False, **kwargs):
+    await asyncio.sleep(UPSTREAM_LATENCY)  # Time to first token / full response
+    if stream:
+        return _StandinTokenStream(STANDIN_VERDICT)
+    message = types.SimpleNamespace(content=STANDIN_VERDICT)
+    return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+
+def _use_standins(agent):
+    agent.search_client = _StandinSearch()
+    agent.llm_client = types.SimpleNamespace(
+        chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=_standin_completion))
+    )
+
+
+def standin_app():
+    """
+    uvicorn factory ("benchmarks:standin_app"): the real main:app with Groq and
+    Tavily swapped for fixed-latency stand-ins. Loaded once per worker process.
+    """
+    import main
+
+    _use_standins(main.agent)
+    return main.app
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_for_workers(client, base_url: str, workers: int, timeout: float = 60.0):
+    # "/" reports the answering worker's pid; wait until every worker has answered.
+    pids = set()
+    deadline = time.monotonic() + timeout
+    while len(pids) < workers and time.monotonic() < deadline:
+        try:
+            response = await client.get(f"{base_url}/", headers={"Connection": "close"})
+            pids.add(response.json()["cache"]["pid"])
+        except Exception:
+            await asyncio.sleep(0.2)
+    if len(pids) < workers:
+        raise RuntimeError(f"only {len(pids)}/{workers} workers came up")
+
+
+async def _drive(base_url: str, workers: int, duration: float, concurrency: int, hit_ratio: float, seed: int):
+    """
+    Closed-loop load on /api/verify-text. Each request repeats an already-sent
+    claim with probability `hit_ratio` (served from the shared cache, whichever
+    worker verified it first), otherwise sends a new claim (pays the stand-in
+    search + LLM latency).
+    """
+    import httpx
+
+    rng = random.Random(seed)
+    seen, latencies = [], []
+    fresh = 0
+
+    async with httpx.AsyncClient(timeout=30.0, limits=httpx.Limits(max_connections=concurrency)) as client:
+        await _wait_for_workers(client, base_url, workers)
+        stop_at = time.perf_counter() + duration
+
+        async def user():
+            nonlocal fresh
+            while time.perf_counter() < stop_at:
+                if seen and rng.random() < hit_ratio:
+                    claim = rng.choice(seen)
+                else:
+                    fresh += 1
+                    claim = f"Benchmark claim {seed}-{fresh}: the repo rate was held at 6.5 percent."
+                started = time.perf_counter()
+                response = await client.post(f"{base_url}/api/verify-text", json={"text": claim})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+                seen.append(claim)
+
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "fresh": fresh,
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0,
+    }
+
+
+def bench_workers(max_workers: int, duration: float, concurrency: int, hit_ratio: float, workdir: str):
+    print(f"cpus: {os.cpu_count()}  concurrency: {concurrency}  target hit ratio: {hit_ratio:.2f}  "
+          f"stand-in latency: {UPSTREAM_LATENCY * 1000:.0f} ms")
+    print(f"{'workers':>8} {'requests':>9} {'misses':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'speedup':>8}")
+
+    baseline = None
+    for workers in range(1, max_workers + 1):
+        port = _free_port()
+        # A fresh cache/job file per run so every run starts cold.
+        env = {
+            **os.environ,
+            "CACHE_PATH": os.path.join(workdir, f"cache-{workers}.db"),
+            "JOBS_PATH": os.path.join(workdir, f"jobs-{workers}.db"),
+        }
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "benchmarks:standin_app", "--factory",
+             "--workers", str(workers), "--port", str(port), "--log-level", "warning", "--no-access-log"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            env=env,
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            stats = asyncio.run(_drive(f"http://127.0.0.1:{port}", workers, duration, concurrency, hit_ratio, seed=workers))
+        finally:
+            server.terminate()
+            server.wait(timeout=60)
+
+        throughput = stats["requests"] / duration
+        baseline = baseline or throughput
+        print(f"{workers:>8} {stats['requests']:>9} {stats['fresh']:>7} {throughput:>8.1f} "
+              f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {throughput / baseline:>7.2f}x")
+
+
+def _tier1_payload(n_links: int) -> list:
+    """
+    Builds a realistic /api/check-credibility response (mix of tagged/untagged links).
+    """
+    from credibility_sources import MVP_CREDIBILITY_DATA, DEFAULT_UNSCORED_REASON
+
+    domains = list(MVP_CREDIBILITY_DATA)
+    payload = []
+    for i in range(n_links):
+        domain = domains[i % len(domains)] if i % 3 else f"unknown-blog-{i}.com"
+        data = MVP_CREDIBILITY_DATA.get(domain, {})
+        payload.append({
+            "url": f"https://{domain}/news/story-{i}",
+            "domain": domain,
+            "verdict": "IFCN_CERTIFIED_PUBLISHER" if data else "UNVERIFIED_PUBLISHER",
+            "label": data.get("tag_ui", "UNSCORED"),
+            "tag_reason": data.get("tag_reason", DEFAULT_UNSCORED_REASON),
+        })
+    return payload
+
+
+def _cpu_per_call(fn, iterations: int) -> float:
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - start) / iterations * 1e6  # microseconds
+
+
+def bench_serialization(iterations: int):
+    from compression import compress, brotli
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse, ORJSONResponse
+
+    def default_path(data):
+        return JSONResponse(jsonable_encoder(data)).body
+
+    def orjson_path(data):
+        return ORJSONResponse(data).body
+
+    print(f"{'links':>6} {'path':<16} {'bytes':>9} {'cpu us/req':>11}")
+    for n_links in (10, 50, 100):
+        data = _tier1_payload(n_links)
+        rows = [
+            ("default json", lambda: default_path(data)),
+            ("orjson", lambda: orjson_path(data)),
+            ("orjson+gzip", lambda: compress(orjson_path(data), "gzip")),
+        ]
+        if brotli is not None:
+            rows.append(("orjson+br", lambda: compress(orjson_path(data), "br")))
+
+        for name, fn in rows:
+            size = len(fn())
+            cpu = _cpu_per_call(fn, iterations)
+            print(f"{n_links:>6} {name:<16} {size:>9} {cpu:>11.1f}")
+
+
+def _synthetic_article(rng, vocab, words: int) -> str:
+    # Zipf word frequencies, roughly like news prose.
+    weights = [1 / rank for rank in range(1, len(vocab) + 1)]
+    return " ".join(rng.choices(vocab, weights=weights, k=words))
+
+
+def bench_fingerprint(iterations: int, copies: int):
+    import fingerprint
+
+    rng = random.Random(7)
+    vocab = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 10))) for _ in range(8000)]
+    body = _synthetic_article(rng, vocab, 2600)[:15000]
+    print(f"article length: {len(body)} chars")
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fp = fingerprint.simhash(body)
+    print(f"simhash: {(time.perf_counter() - start) / iterations * 1000:.2f} ms per article")
+
+    # Syndicated copies: same body, different site chrome and headline.
+    def syndicate(text):
+        header = _synthetic_article(rng, vocab, rng.randint(30, 150))
+        footer = _synthetic_article(rng, vocab, rng.randint(30, 150))
+        return f"{header} {text} {footer}"[:15000]
+
+    near = [fingerprint.hamming(fp, fingerprint.simhash(syndicate(body))) for _ in range(copies)]
+    unrelated = [
+        fingerprint.hamming(fp, fingerprint.simhash(_synthetic_article(rng, vocab, 2600)[:15000]))
+        for _ in range(copies)
+    ]
+    print(f"hamming, syndicated copies: max {max(near)}  mean {sum(near) / len(near):.1f}")
+    print(f"hamming, unrelated articles: min {min(unrelated)}  mean {sum(unrelated) / len(unrelated):.1f}")
+    print(f"threshold: {fingerprint.HAMMING_THRESHOLD} bits, Jaccard >= {fingerprint.SAMPLE_MIN_JACCARD}")
+
+    # Same site, different stories: scraped text keeps ~9k chars of nav/footer.
+    chrome_top = _synthetic_article(rng, vocab, 1000)[:6000]
+    chrome_bottom = _synthetic_article(rng, vocab, 500)[:3000]
+
+    def same_site(text):
+        return f"{chrome_top} {text} {chrome_bottom}"[:15000]
+
+    site_fp, site_sample = fingerprint.fingerprint_article(same_site(_synthetic_article(rng, vocab, 400)))
+    site_pairs = [
+        fingerprint.fingerprint_article(same_site(_synthetic_article(rng, vocab, 400)))
+        for _ in range(copies)
+    ]
+    site_hamming = [fingerprint.hamming(site_fp, fp) for fp, _ in site_pairs]
+    site_jaccard = [fingerprint.sample_jaccard(site_sample, sample) for _, sample in site_pairs]
+    syndicated_jaccard = [
+        fingerprint.sample_jaccard(fingerprint.fingerprint_article(body)[1],
+                                   fingerprint.fingerprint_article(syndicate(body))[1])
+        for _ in range(copies)
+    ]
+    print(f"same-site unrelated: hamming min {min(site_hamming)}  Jaccard max {max(site_jaccard):.2f}")
+    print(f"syndicated copies:   Jaccard min {min(syndicated_jaccard):.2f}")
+
+    # Hit rate when every story arrives once per outlet, plus same-site
+    # neighbours that must never be served another story's claims.
+    stories = [_synthetic_article(rng, vocab, 2600) for _ in range(5)]
+    wrong = 0
+    for i, story in enumerate(stories):
+        for _ in range(copies):
+            article_fp, sample = fingerprint.fingerprint_article(syndicate(story))
+            cached = fingerprint.lookup_claims(article_fp, sample)
+            if cached is None:
+                fingerprint.store_claims(article_fp, sample, [f"story {i} claim"])
+            elif cached != [f"story {i} claim"]:
+                wrong += 1
+    for i in range(copies):
+        article_fp, sample = fingerprint.fingerprint_article(same_site(_synthetic_article(rng, vocab, 400)))
+        cached = fingerprint.lookup_claims(article_fp, sample)
+        if cached is None:
+            fingerprint.store_claims(article_fp, sample, [f"site story {i} claim"])
+        else:
+            wrong += 1
+    stats = fingerprint.claim_cache_stats()
+    print(f"claim cache: {stats} (ideal hit rate {5 * (copies - 1) / (6 * copies):.3f}), wrong claims served: {wrong}")
+
+
+def bench_stream(tokens_per_second: float, runs: int):
+    global STANDIN_TOKENS_PER_SECOND
+    from json_stream import IncrementalJSONObject
+    from agentic_verifier import AgenticVerifier, stream_stats
+
+    # Full Tier-2 path (cache miss, stand-in search, streamed stand-in LLM).
+    STANDIN_TOKENS_PER_SECOND = tokens_per_second
+    tokens = _StandinTokenStream(STANDIN_VERDICT).pending
+    agent = AgenticVerifier()
+    _use_standins(agent)
+
+    async def run():
+        for i in range(runs):
+            async for _ in agent.verify_text_stream(f"Benchmark claim number {i} about the repo rate."):
+                pass
+
+    asyncio.run(run())
+    stats = stream_stats()
+    print(f"{len(tokens)} tokens at {tokens_per_second:.0f} tok/s, {runs} runs, "
+          f"stand-in search/first token {UPSTREAM_LATENCY * 1000:.0f} ms each")
+    print(f"time to verdict: {stats['avg_time_to_verdict_ms']:.1f} ms")
+    print(f"total (non-streaming latency): {stats['avg_total_ms']:.1f} ms")
+
+    start = time.process_time()
+    for _ in range(runs):
+        parser = IncrementalJSONObject()
+        for token in tokens:
+            parser.feed(token)
+    print(f"parser cpu: {(time.process_time() - start) / (runs * len(tokens)) * 1e6:.1f} us/token")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline Credible backend benchmarks")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    workers = sub.add_parser("workers", help="Throughput scaling across worker processes sharing one cache")
+    workers.add_argument("--max-workers", type=int, default=os.cpu_count() or 2)
+    workers.add_argument("--duration", type=float, default=5.0)
+    workers.add_argument("--concurrency", type=int, default=16)
+    workers.add_argument("--hit-ratio", type=float, default=0.7)
+
+    serialization = sub.add_parser("serialization", help="Bytes on the wire and CPU per Tier-1 response")
+    serialization.add_argument("--iterations", type=int, default=200)
+
+    fp = sub.add_parser("fingerprint", help="SimHash cost on 15k-char articles and claim-cache hit rate")
+    fp.add_argument("--iterations", type=int, default=50)
+    fp.add_argument("--copies", type=int, default=20)
+
+    stream = sub.add_parser("stream", help="Time-to-verdict vs total latency for streamed Tier-2 verdicts")
+    stream.add_argument("--tokens-per-second", type=float, default=250.0)
+    stream.add_argument("--runs", type=int, default=5)
+
+    args = parser.parse_args(argv)
+    # Service modules create their SQLite files on import; keep them out of the repo
+    # and remove them afterwards.
+    with tempfile.TemporaryDirectory(prefix="credible-bench-") as tmp:
+        os.environ.setdefault("CACHE_PATH", os.path.join(tmp, "cache.db"))
+        os.environ.setdefault("JOBS_PATH", os.path.join(tmp, "jobs.db"))
+
+        if args.bench == "workers":
+            bench_workers(args.max_workers, args.duration, args.concurrency, args.hit_ratio, tmp)
+        elif args.bench == "serialization":
+            bench_serialization(args.iterations)
+        elif args.bench == "fingerprint":
+            bench_fingerprint(args.iterations, args.copies)
+        elif args.bench == "stream":
+            bench_stream(args.tokens_per_second, args.runs)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
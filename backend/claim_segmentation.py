@@ -0,0 +1,88 @@
+import re
+import unicodedata
+from typing import List
+
+# --- CONFIGURATION ---
+MAX_SUB_CLAIMS = 5         # More than this in one highlight is an article; use Tier 3
+MIN_CLAIM_WORDS = 4        # "Really?" / "Read more." aren't checkable
+
+# Curly quotes, primes, dashes and other look-alikes that defeat exact-match
+# caching and confuse search. NFKC already folds full-width forms and ligatures.
+_CHAR_MAP = str.maketrans({
+    "\u2018": "'", "\u2019": "'", "\u201a": "'", "\u201b": "'", "\u2032": "'",
+    "\u201c": '"', "\u201d": '"', "\u201e": '"', "\u201f": '"', "\u2033": '"',
+    "\u00ab": '"', "\u00bb": '"',
+    "\u2013": "-", "\u2014": "-", "\u2212": "-",
+    "\u2026": "...",
+    "\u00a0": " ",
+})
+_INVISIBLE = re.compile("[\u200b-\u200f\u2060\ufeff]")  # Zero-width spaces/joiners, BOM
+
+# Abbreviations whose trailing period doesn't end a sentence.
+_ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "approx",
+    "rs", "govt", "dept", "inc", "ltd", "co", "corp", "jan", "feb", "mar",
+    "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec", "u.s", "u.k", "i.e", "e.g",
+}
+# Also ordinary words, so only abbreviations before a number: "No. 5", "Est. 1998"
+# (but "The minister said no. The opposition...").
+_NUMERIC_ABBREVIATIONS = {"no", "est"}
+
+# A boundary is ., ! or ? (plus closing quotes/brackets) followed by whitespace
+# and something that can start a sentence.
+_BOUNDARY = re.compile(r"""([.!?]+["')\]]*)\s+(?=["'(\[]?[A-Z0-9])""")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Unicode (NFKC), quotes/dashes and whitespace normalization.
+    """
+    text = unicodedata.normalize("NFKC", text or "")
+    text = _INVISIBLE.sub("", text).translate(_CHAR_MAP)
+    return " ".join(text.split())
+
+
+def _ends_with_abbreviation(fragment: str, following: str) -> bool:
+    last = fragment.rstrip(".").rsplit(" ", 1)[-1].lower()
+    if last in _NUMERIC_ABBREVIATIONS:
+        return following[:1].isdigit()
+    # Single letters are initials ("N. Modi") or list markers; a lone digit
+    # ends a sentence ("on Jan. 5. It cost...").
+    return last in _ABBREVIATIONS or (len(last) == 1 and last.isalpha())
+
+
+def segment_claims(text: str) -> List[str]:
+    """
+    Splits normalized text into sentence-level claims. Fragments too short to
+    check are glued onto their neighbour; exact duplicates are dropped.
+    """
+    pieces, start = [], 0
+    for match in _BOUNDARY.finditer(text):
+        end = match.end(1)
+        if _ends_with_abbreviation(text[start:end], text[match.end():]):
+            continue
+        pieces.append(text[start:end].strip())
+        start = match.end()
+    pieces.append(text[start:].strip())
+
+    claims: List[str] = []
+    carry = ""
+    for piece in filter(None, pieces):
+        piece = f"{carry} {piece}".strip() if carry else piece
+        if len(piece.split()) < MIN_CLAIM_WORDS:
+            carry = piece
+            continue
+        carry = ""
+        if piece not in claims:
+            claims.append(piece)
+    if carry:
+        if claims:
+            claims[-1] = f"{claims[-1]} {carry}"
+        else:
+            claims.append(carry)
+
+    if len(claims) > MAX_SUB_CLAIMS:
+        # Keep the first few separate and fold the tail into the last one,
+        # so nothing the user highlighted is silently ignored.
+        claims = claims[:MAX_SUB_CLAIMS - 1] + [" ".join(claims[MAX_SUB_CLAIMS - 1:])]
+    return claims
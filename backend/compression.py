@@ -0,0 +1,109 @@
+import gzip
+from typing import Optional
+
+# Brotli is optional: without it we still negotiate gzip.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# --- CONFIGURATION ---
+# Below this size the compression header overhead isn't worth the CPU.
+DEFAULT_MINIMUM_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # 4-6 is the sweet spot for dynamic responses
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Picks "br", "gzip" or None from an Accept-Encoding header.
+    Brotli wins when both are offered (and installed); q=0 means refused.
+    """
+    offered = {}
+    for part in accept_encoding.lower().split(","):
+        token, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if token:
+            offered[token] = quality
+
+    if brotli is not None and offered.get("br", 0) > 0:
+        return "br"
+    if offered.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+# --- ASGI MIDDLEWARE ---
+class CompressionMiddleware:
+    """
+    Negotiated brotli/gzip for single-body responses above `minimum_size`.
+    Streamed responses (more_body=True) pass through untouched so that
+    incremental output is never held back by a compressor buffer.
+    """
+
+    def __init__(self, app, minimum_size: int = DEFAULT_MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        started = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, started
+
+            if message["type"] == "http.response.start":
+                # Hold the headers until we've seen the first body chunk.
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or started:
+                await send(message)
+                return
+
+            started = True
+            body = message.get("body", b"")
+            response_headers = [(k, v) for k, v in start_message["headers"]]
+            already_encoded = any(k.lower() == b"content-encoding" for k, _ in response_headers)
+
+            if message.get("more_body", False) or already_encoded or len(body) < self.minimum_size:
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding)
+            vary = [v for k, v in response_headers if k.lower() == b"vary"] + [b"Accept-Encoding"]
+            response_headers = [
+                (k, v) for k, v in response_headers if k.lower() not in (b"content-length", b"vary")
+            ]
+            response_headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(compressed)).encode("latin-1")),
+                (b"vary", b", ".join(vary)),
+            ]
+            await send({**start_message, "headers": response_headers})
+            await send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,45 @@
+import time
+from decouple import config
+from typing import Optional
+
+# --- CONFIGURATION ---
+# End-to-end budgets per endpoint (seconds). Each stage takes a share of
+# whatever is left, so a slow scrape eats into the LLM's time, not the user's.
+VERIFY_DEADLINE_SECONDS = config("VERIFY_DEADLINE_SECONDS", default=25.0, cast=float)
+EXTRACT_DEADLINE_SECONDS = config("EXTRACT_DEADLINE_SECONDS", default=60.0, cast=float)
+
+# Below this a stage isn't worth starting.
+MIN_STAGE_SECONDS = 0.5
+
+
+class Deadline:
+    """
+    A fixed point in (monotonic) time that a whole request must finish by.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() < MIN_STAGE_SECONDS
+
+    def share(self, fraction: float, cap: Optional[float] = None) -> float:
+        """
+        Timeout for the next stage: `fraction` of the remaining budget, never
+        more than `cap` (the stage's own hard limit).
+        """
+        budget = self.remaining() * fraction
+        return min(budget, cap) if cap is not None else budget
+
+
+def stage_timeout(deadline: Optional[Deadline], fraction: float, cap: float) -> float:
+    """
+    Helper for call sites where the deadline is optional: without one, the
+    stage keeps its original hard limit.
+    """
+    return deadline.share(fraction, cap) if deadline else cap
@@ -0,0 +1,409 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+from decouple import config
+from typing import Any, Awaitable, Callable, Dict, Optional
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+
+# --- CONFIGURATION ---
+# Persistent queue for Tier-3 scans. Lives next to the shared cache so it
+# survives restarts and is visible to every uvicorn worker.
+JOBS_PATH = config(
+    "JOBS_PATH",
+    default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "credible_jobs.db"),
+)
+JOB_WORKERS = config("JOB_WORKERS", default=2, cast=int)           # Concurrent scans per process
+JOB_RESULT_TTL = config("JOB_RESULT_TTL", default=3600, cast=int)  # Finished jobs dedupe for this long
+JOB_STALE_SECONDS = config("JOB_STALE_SECONDS", default=180, cast=int)  # "running" longer = crashed worker
+JOB_POLL_INTERVAL = 0.5
+JOB_DB_RETRY_SECONDS = 1.0  # Back-off after a SQLite error (e.g. "database is locked")
+JOB_DB_ATTEMPTS = 3         # Tries for writes a finished scan depends on
+
+# Query params that never change the article itself.
+TRACKING_PREFIXES = ("utm_",)
+TRACKING_PARAMS = {"fbclid", "gclid", "ref", "amp"}
+
+# Signature of the function that actually does a scan:
+#   await processor(url, report) -> dict
+# `report(stage, **partial)` records incremental progress for pollers.
+Reporter = Callable[..., Awaitable[None]]
+Processor = Callable[[str, Reporter], Awaitable[Dict[str, Any]]]
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Collapses trivially different URLs for the same article:
+    scheme/host case, "www.", fragments, trailing slashes, tracking params.
+    """
+    try:
+        parts = urlparse(url.strip())
+    except ValueError:
+        return url.strip()
+
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not (k.lower().startswith(TRACKING_PREFIXES) or k.lower() in TRACKING_PARAMS)
+    ))
+    path = parts.path.rstrip("/") or "/"
+    return urlunparse(("https", host, path, "", query, ""))
+
+
+# --- THE QUEUE CLASS ---
+class JobQueue:
+    """
+    SQLite-backed job queue with a bounded asyncio worker pool.
+    Jobs move queued -> running -> done | failed. Claiming a job is a single
+    UPDATE inside an IMMEDIATE transaction, so several processes can share the
+    same file without double-processing.
+    """
+
+    def __init__(self, path: str = JOBS_PATH, workers: int = JOB_WORKERS):
+        self.path = path
+        self.workers = workers
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        # Status polls and stats read on their own connection and lock, so they
+        # never queue behind a writer waiting out another process's write lock.
+        self._reader_conn: Optional[sqlite3.Connection] = None
+        self._reader_pid: Optional[int] = None
+        self._reader_lock = threading.Lock()
+        self._tasks = []
+        self._busy = 0
+        self._busy_seconds = 0.0
+        self._started_at: Optional[float] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " url TEXT NOT NULL,"
+            " canonical_url TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " stage TEXT NOT NULL,"
+            " partial TEXT,"
+            " result TEXT,"
+            " error TEXT,"
+            " created_at REAL NOT NULL,"
+            " started_at REAL,"
+            " finished_at REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_canonical ON jobs (canonical_url, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        return conn
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = self._open()
+            self._pid = os.getpid()
+        return self._conn
+
+    def _reader(self) -> sqlite3.Connection:
+        if self._reader_conn is None or self._reader_pid != os.getpid():
+            self._reader_conn = self._open()
+            self._reader_pid = os.getpid()
+        return self._reader_conn
+
+    def _execute(self, sql: str, params: tuple = ()):
+        with self._lock:
+            return self._connection().execute(sql, params).fetchall()
+
+    def _read(self, sql: str, params: tuple = ()):
+        # WAL readers don't wait for writers; this only blocks on other reads.
+        with self._reader_lock:
+            return self._reader().execute(sql, params).fetchall()
+
+    # ------------------------------------------------------------------
+    # PRODUCER SIDE
+    # ------------------------------------------------------------------
+    def submit(self, url: str) -> Dict[str, Any]:
+        """
+        Enqueues a scan, or returns the existing job for the same canonical URL
+        if one is pending, running, or finished successfully within JOB_RESULT_TTL.
+        A "done" job with no claims (deadline cut, Groq circuit open) isn't
+        reused: it says nothing about the article, so the next scan tries again.
+        """
+        canonical = canonicalize_url(url)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                existing = conn.execute(
+                    "SELECT id, status FROM jobs WHERE canonical_url = ?"
+                    " AND (status IN ('queued', 'running') OR (status = 'done' AND finished_at > ?"
+                    "      AND json_array_length(result, '$.claims') > 0))"
+                    " ORDER BY created_at DESC LIMIT 1",
+                    (canonical, now - JOB_RESULT_TTL),
+                ).fetchone()
+                if existing:
+                    conn.execute("COMMIT")
+                    return {"job_id": existing["id"], "status": existing["status"], "deduplicated": True}
+
+                job_id = uuid.uuid4().hex
+                conn.execute(
+                    "INSERT INTO jobs (id, url, canonical_url, status, stage, created_at)"
+                    " VALUES (?, ?, ?, 'queued', 'queued', ?)",
+                    (job_id, url, canonical, now),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        if self._wakeup:
+            self._wakeup.set()
+        return {"job_id": job_id, "status": "queued", "deduplicated": False}
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._read("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        if not rows:
+            return None
+        row = rows[0]
+        job = {
+            "job_id": row["id"],
+            "url": row["url"],
+            "status": row["status"],
+            "stage": row["stage"],
+            "partial": json.loads(row["partial"]) if row["partial"] else {},
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+        }
+        if row["status"] == "queued":
+            job["position"] = self._read(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created_at < ?",
+                (row["created_at"],),
+            )[0][0]
+        return job
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Long-poll: returns as soon as the job's status or stage changes
+        (or it finishes), or after `timeout` seconds with the current state.
+        Each poll runs in a thread so SQLite never blocks the event loop.
+        """
+        job = await asyncio.to_thread(self.get, job_id)
+        if job is None or job["status"] in ("done", "failed"):
+            return job
+
+        seen = (job["status"], job["stage"])
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+            job = await asyncio.to_thread(self.get, job_id)
+            if job is None or (job["status"], job["stage"]) != seen:
+                return job
+        return job
+
+    # ------------------------------------------------------------------
+    # CONSUMER SIDE
+    # ------------------------------------------------------------------
+    def _claim(self) -> Optional[sqlite3.Row]:
+        now = time.time()
+        # Idle workers poll every couple of seconds in every process: only take
+        # the write lock when a plain read says there is something to claim.
+        if not self._read(
+            "SELECT 1 FROM jobs WHERE status = 'queued' OR (status = 'running' AND started_at < ?) LIMIT 1",
+            (now - JOB_STALE_SECONDS,),
+        ):
+            return None
+
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Oldest queued job first; "running" jobs abandoned by a dead worker count as queued.
+                row = conn.execute(
+                    "SELECT id, url FROM jobs WHERE status = 'queued'"
+                    " OR (status = 'running' AND started_at < ?)"
+                    " ORDER BY created_at LIMIT 1",
+                    (now - JOB_STALE_SECONDS,),
+                ).fetchone()
+                if row:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'running', stage = 'starting', started_at = ? WHERE id = ?",
+                        (now, row["id"]),
+                    )
+                conn.execute("COMMIT")
+                return row
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _finish(self, job_id: str, result: Optional[dict] = None, error: Optional[str] = None):
+        self._execute(
+            "UPDATE jobs SET status = ?, stage = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+            (
+                "failed" if error else "done",
+                "failed" if error else "done",
+                json.dumps(result) if result is not None else None,
+                error,
+                time.time(),
+                job_id,
+            ),
+        )
+
+    def _requeue(self, job_id: str):
+        self._execute(
+            "UPDATE jobs SET status = 'queued', stage = 'queued', started_at = NULL WHERE id = ?",
+            (job_id,),
+        )
+
+    async def _write(self, fn: Callable[..., Any], *args, **kwargs) -> bool:
+        """
+        Runs a queue write off the event loop, retrying on SQLite errors.
+        Returns False if it never went through (logged, not raised).
+        """
+        for attempt in range(1, JOB_DB_ATTEMPTS + 1):
+            try:
+                await asyncio.to_thread(fn, *args, **kwargs)
+                return True
+            except sqlite3.Error as e:
+                print(f"⚠️ Job queue write failed ({attempt}/{JOB_DB_ATTEMPTS}): {e}")
+                await asyncio.sleep(JOB_DB_RETRY_SECONDS * attempt)
+        return False
+
+    async def _worker(self, processor: Processor):
+        while True:
+            # SQLite calls block for up to the busy timeout, so they run in a thread.
+            # A locked database must not kill the worker; back off and try again.
+            try:
+                row = await asyncio.to_thread(self._claim)
+            except sqlite3.Error as e:
+                print(f"⚠️ Job queue claim failed: {e}. Retrying in {JOB_DB_RETRY_SECONDS:.0f}s.")
+                await asyncio.sleep(JOB_DB_RETRY_SECONDS)
+                continue
+
+            if row is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=JOB_POLL_INTERVAL * 4)
+                except asyncio.TimeoutError:
+                    pass  # Other processes may have queued work; look again.
+                continue
+
+            job_id = row["id"]
+
+            async def report(stage: str, **partial):
+                # Progress is best effort; a failed update shouldn't fail the scan.
+                try:
+                    await asyncio.to_thread(
+                        self._execute,
+                        "UPDATE jobs SET stage = ?, partial = ? WHERE id = ?",
+                        (stage, json.dumps(partial), job_id),
+                    )
+                except sqlite3.Error as e:
+                    print(f"⚠️ Job progress update failed: {e}")
+
+            self._busy += 1
+            started = time.monotonic()
+            # If a final write never lands the job stays "running" and is
+            # picked up again once it goes stale (JOB_STALE_SECONDS).
+            try:
+                result = await processor(row["url"], report)
+                await self._write(self._finish, job_id, result=result)
+            except asyncio.CancelledError:
+                # Shutting down: hand the job back so it runs after restart.
+                try:
+                    self._requeue(job_id)
+                except sqlite3.Error as e:
+                    print(f"⚠️ Could not requeue job {job_id}: {e}")
+                raise
+            except Exception as e:
+                await self._write(self._finish, job_id, error=str(getattr(e, "detail", e)))
+            finally:
+                self._busy -= 1
+                self._busy_seconds += time.monotonic() - started
+
+    def start(self, processor: Processor):
+        """
+        Spawns the worker pool on the running event loop (call from lifespan startup).
+        """
+        self._wakeup = asyncio.Event()
+        self._started_at = time.monotonic()
+        self._tasks = [asyncio.create_task(self._worker(processor)) for _ in range(self.workers)]
+        print(f"🧵 Job queue started with {self.workers} workers.")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+            self._pid = None
+        with self._reader_lock:
+            if self._reader_conn is not None and self._reader_pid == os.getpid():
+                self._reader_conn.close()
+            self._reader_conn = None
+            self._reader_pid = None
+
+    def purge_finished(self) -> int:
+        """
+        Deletes done/failed jobs older than JOB_RESULT_TTL (they no longer
+        deduplicate anything). Returns how many were removed.
+        """
+        try:
+            with self._lock:
+                cursor = self._connection().execute(
+                    "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                    (time.time() - JOB_RESULT_TTL,),
+                )
+                return cursor.rowcount
+        except sqlite3.Error as e:
+            print(f"⚠️ Job purge failed: {e}")
+            return 0
+
+    # ------------------------------------------------------------------
+    # METRICS
+    # ------------------------------------------------------------------
+    def stats(self) -> Dict[str, Any]:
+        """
+        Queue depth and wait times are global (shared file); utilization is this process.
+        """
+        now = time.time()
+        uptime = time.monotonic() - self._started_at if self._started_at else 0.0
+        capacity = uptime * self.workers
+        try:
+            counts = {row["status"]: row["n"] for row in self._read(
+                "SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"
+            )}
+            oldest = self._read("SELECT MIN(created_at) FROM jobs WHERE status = 'queued'")[0][0]
+            avg_wait = self._read(
+                "SELECT AVG(started_at - created_at) FROM jobs WHERE started_at IS NOT NULL AND created_at > ?",
+                (now - JOB_RESULT_TTL,),
+            )[0][0]
+        except sqlite3.Error as e:
+            return {"error": str(e), "workers": self.workers, "busy_workers": self._busy}
+
+        return {
+            "queue_depth": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "oldest_queued_seconds": round(now - oldest, 1) if oldest else 0.0,
+            "avg_wait_seconds": round(avg_wait, 2) if avg_wait else 0.0,
+            "workers": self.workers,
+            "busy_workers": self._busy,
+            "utilization": round(self._busy_seconds / capacity, 3) if capacity else 0.0,
+        }
+
+
+# Module-level singleton, same pattern as shared_cache.
+job_queue = JobQueue()
@@ -0,0 +1,138 @@
+import json
+from typing import Any, List, Optional, Tuple
+
+# Events emitted by IncrementalJSONObject.feed():
+#   ("field", key, value)    a top-level field is complete (value fully parsed)
+#   ("partial", key, text)   more characters of a top-level string value arrived
+Event = Tuple[str, str, Any]
+
+
+class IncrementalJSONObject:
+    """
+    Parses a single JSON object as it streams in, token by token, and reports
+    each top-level field the moment its value is complete. Anything before the
+    first "{" (e.g. a model's "Here is the JSON:") is ignored.
+    Nested values are returned whole once closed; only top-level strings
+    produce "partial" events.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._started = False
+        self.done = False
+        # Top-level parsing state
+        self._key: Optional[str] = None
+        self._key_start: Optional[int] = None
+        self._expect_value = False
+        self._value_start: Optional[int] = None
+        self._partial_sent = 0
+
+    def feed(self, chunk: str) -> List[Event]:
+        self.buffer += chunk
+        events: List[Event] = []
+
+        while self._pos < len(self.buffer) and not self.done:
+            ch = self.buffer[self._pos]
+
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+                self._pos += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._key_start is not None:
+                        # Closed a top-level key.
+                        self._key = json.loads(self.buffer[self._key_start:self._pos + 1])
+                        self._key_start = None
+                    elif self._depth == 1 and self._value_start is not None:
+                        # Closed a top-level string value.
+                        self._emit_partial(events, end=self._pos)
+                        self._emit_field(events, self._pos + 1)
+                self._pos += 1
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    if self._expect_value:
+                        self._value_start = self._pos
+                        self._expect_value = False
+                        self._partial_sent = 0
+                    elif self._key is None:
+                        self._key_start = self._pos
+            elif ch == ":" and self._depth == 1:
+                self._expect_value = True
+            elif ch in "{[":
+                if self._depth == 1 and self._expect_value:
+                    self._value_start = self._pos
+                    self._expect_value = False
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._value_start is not None:
+                    self._emit_field(events, self._pos + 1)
+                elif self._depth == 0:
+                    # End of the object: flush a trailing scalar (number/bool/null).
+                    if self._value_start is not None:
+                        self._emit_field(events, self._pos)
+                    self.done = True
+            elif ch == "," and self._depth == 1 and self._value_start is not None:
+                self._emit_field(events, self._pos)
+            elif self._depth == 1 and self._expect_value and not ch.isspace():
+                # Start of a scalar: number, true, false, null.
+                self._value_start = self._pos
+                self._expect_value = False
+            self._pos += 1
+
+        # Still inside a top-level string value: stream what we have so far.
+        if self._in_string and self._depth == 1 and self._value_start is not None:
+            self._emit_partial(events, end=self._pos)
+        return events
+
+    def _emit_field(self, events: List[Event], end: int):
+        raw = self.buffer[self._value_start:end].strip()
+        try:
+            events.append(("field", self._key, json.loads(raw, strict=False)))
+        except json.JSONDecodeError:
+            pass  # Malformed value; the final full-object validation will catch it.
+        self._key = None
+        self._value_start = None
+
+    def _emit_partial(self, events: List[Event], end: int):
+        raw = self.buffer[self._value_start + 1:end]
+        # The chunk may end mid-escape (\" or \u00e9): drop up to 6 trailing
+        # characters until what's left decodes; they'll arrive with the next chunk.
+        for trim in range(7):
+            try:
+                text = json.loads(f'"{raw[:len(raw) - trim]}"', strict=False)
+                break
+            except json.JSONDecodeError:
+                continue
+        else:
+            return
+        if len(text) > self._partial_sent:
+            events.append(("partial", self._key, text[self._partial_sent:]))
+            self._partial_sent = len(text)
+
+    def text(self) -> str:
+        """
+        The object as received so far, from the opening brace up to the
+        closing one once it has arrived (a trailing "```" or note is dropped).
+        """
+        start = self.buffer.find("{")
+        if start == -1:
+            return ""
+        return self.buffer[start:self._pos] if self.done else self.buffer[start:]
+
@@ -1,7 +1,13 @@
 import uvicorn
 import os
-from fastapi import FastAPI, HTTPException
+import asyncio
+import sqlite3
+import orjson
+from contextlib import asynccontextmanager
+from decouple import config
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from typing import List, Dict, Optional
 from urllib.parse import urlparse 
 from pydantic import BaseModel, Field
@@ -15,20 +21,64 @@ except ImportError:
 
 # Import the existing Scraper Service
 try:
-    from scraper_service import fetch_article_content
+    from scraper_service import fetch_article_content, TIMED_OUT
 except ImportError:
     print("⚠️ Warning: scraper_service.py not found. Tier 3 will fail.")
-    async def fetch_article_content(url): return None, "Scraper module missing."
+    TIMED_OUT = "Timed out"
+    async def fetch_article_content(url, deadline=None): return None, "Scraper module missing."
 
 # --- IMPORT THE NEW PRODUCTION AGENT ---
-from agentic_verifier import AgenticVerifier
+from agentic_verifier import AgenticVerifier, stream_stats
+from shared_cache import shared_cache
+from compression import CompressionMiddleware
+from deadlines import Deadline, VERIFY_DEADLINE_SECONDS, EXTRACT_DEADLINE_SECONDS
+from job_queue import job_queue
+from prefetch import EvidencePrefetcher
+from fingerprint import claim_cache_stats
+from upstream import breaker_states, executor_stats, shutdown_executor
 
 # --- 1. APP CONFIG ---
-app = FastAPI(title="Credible Production Backend", version="5.0-Groq-Tavily")
+# Number of uvicorn worker processes. Every worker shares one SQLite cache,
+# so verdicts/evidence/articles fetched by one worker are hits for the others.
+WORKERS = config("WEB_CONCURRENCY", default=1, cast=int)
+# Seconds a worker gets to finish in-flight requests after SIGTERM.
+GRACEFUL_SHUTDOWN_SECONDS = config("GRACEFUL_SHUTDOWN_SECONDS", default=30, cast=int)
+# Responses smaller than this go out uncompressed.
+COMPRESSION_MIN_BYTES = config("COMPRESSION_MIN_BYTES", default=1024, cast=int)
+# Longest a status long-poll may hold the connection.
+JOB_LONG_POLL_SECONDS = config("JOB_LONG_POLL_SECONDS", default=25.0, cast=float)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup (runs once per worker)
+    removed = shared_cache.purge_expired()
+    finished = job_queue.purge_finished()
+    print(f"🟢 Worker {os.getpid()} ready. Purged {removed} expired cache entries, {finished} finished jobs.")
+    job_queue.start(_extract_claims)
+    yield
+    # Shutdown (after in-flight requests have drained).
+    # Unfinished jobs go back to the queue and resume after restart.
+    await job_queue.stop()
+    await prefetcher.stop()
+    shutdown_executor()
+    shared_cache.close()
+    print(f"🔴 Worker {os.getpid()} shut down cleanly.")
+
+# orjson for every endpoint. Handlers return ORJSONResponse directly so FastAPI
+# skips its jsonable_encoder pass over our (already plain) dicts.
+app = FastAPI(
+    title="Credible Production Backend",
+    version="5.0-Groq-Tavily",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 # Initialize the Groq+Tavily Agent
 agent = AgenticVerifier()
 
+# Opt-in (PREFETCH_ENABLED): Tier-1 search queries warm the evidence cache for Tier 2.
+prefetcher = EvidencePrefetcher(agent._perform_search)
+
 # --- 2. CORS (Critical for Chrome Extension) ---
 origins = [
     "http://127.0.0.1:8000",
@@ -49,6 +99,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Negotiated brotli/gzip (Tier-1 payloads carry a lot of repeated HTML).
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_BYTES)
+
 # --- 3. DATA MODELS ---
 
 # For MVP Tags (Tier 1)
@@ -68,11 +121,51 @@ class VerifyRequest(BaseModel):
 class ArticleRequest(BaseModel):
     url: str
 
-# --- 4. ENDPOINTS ---
+# --- 4. CLIENT DISCONNECT HANDLING ---
+# Nginx's non-standard "client closed request" status. Nobody reads it; it only shows up in logs.
+CLIENT_CLOSED_REQUEST = 499
+
+async def _wait_for_disconnect(raw_request: Request):
+    while True:
+        message = await raw_request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+async def run_until_disconnect(raw_request: Request, work):
+    """
+    Runs `work` but cancels it (and every upstream call it is awaiting) as soon
+    as the client goes away, e.g. the user closes the popup mid-scan.
+    """
+    work_task = asyncio.ensure_future(work)
+    disconnect_task = asyncio.ensure_future(_wait_for_disconnect(raw_request))
+    try:
+        await asyncio.wait({work_task, disconnect_task}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        disconnect_task.cancel()
+        if not work_task.done():
+            work_task.cancel()
+
+    if not work_task.done() or work_task.cancelled():
+        print(f"🛑 Client disconnected from {raw_request.url.path}. Upstream work cancelled.")
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    return work_task.result()
+
+# --- 5. ENDPOINTS ---
 
 @app.get("/")
 def health_check():
-    return {"status": "active", "brain": "Llama-3.3-70B (Groq)", "eyes": "Tavily"}
+    return ORJSONResponse({
+        "status": "active",
+        "brain": "Llama-3.3-70B (Groq)",
+        "eyes": "Tavily",
+        "cache": shared_cache.stats(),
+        "jobs": job_queue.stats(),
+        "prefetch": prefetcher.stats(),
+        "claim_cache": claim_cache_stats(),
+        "breakers": breaker_states(),
+        "upstream_executor": executor_stats(),
+        "streaming": stream_stats(),
+    })
 
 # ==============================================================================
 # FEATURE 1: MVP DOMAIN TAGGING (Tier 1)
@@ -84,6 +177,10 @@ async def check_credibility_tags(payload: CredibilityPayload):
     Checks domains against internal Credibility Database (IFCN + Reputable).
     Used for visual tagging on Google Search Results.
     """
+    # The user is likely to highlight text about this query next.
+    if payload.query:
+        prefetcher.schedule(payload.query)
+
     response_data = []
     
     for item in payload.links:
@@ -118,7 +215,7 @@ async def check_credibility_tags(payload: CredibilityPayload):
         })
     
     print(f"[MVP] Tagged {len(response_data)} links.")
-    return response_data
+    return ORJSONResponse(response_data)
 
 
 # ==============================================================================
@@ -126,16 +223,46 @@ async def check_credibility_tags(payload: CredibilityPayload):
 # Replaced old Gemini logic with new Groq/Tavily Agent.
 # ==============================================================================
 @app.post("/api/verify-text")
-async def verify_text_endpoint(request: VerifyRequest):
+async def verify_text_endpoint(request: VerifyRequest, raw_request: Request):
     """
     Receives highlighted text -> Runs Agentic Verification (Groq + Tavily).
+    Multi-sentence highlights are split and verified claim by claim in parallel.
+    Bounded by VERIFY_DEADLINE_SECONDS; returns a partial (timed_out) verdict if exceeded.
     """
     if not request.text:
         raise HTTPException(status_code=400, detail="No text provided")
     
-    # Using the new agent method
-    result = await agent.verify_claim_agentic(request.text)
-    return result
+    async def work():
+        # Using the new agent method
+        deadline = Deadline(VERIFY_DEADLINE_SECONDS)
+        result = await agent.verify_text_agentic(request.text, deadline=deadline)
+        return ORJSONResponse(result)
+
+    return await run_until_disconnect(raw_request, work())
+
+
+@app.post("/api/verify-text/stream")
+async def verify_text_stream_endpoint(request: VerifyRequest):
+    """
+    Streaming Tier 2: newline-delimited JSON events. The verdict arrives as
+    soon as the model has written it; the explanation follows token by token;
+    the last line is always the full validated result (event "result").
+    """
+    if not request.text:
+        raise HTTPException(status_code=400, detail="No text provided")
+
+    deadline = Deadline(VERIFY_DEADLINE_SECONDS)
+
+    async def events():
+        async for event in agent.verify_text_stream(request.text, deadline=deadline):
+            yield orjson.dumps(event) + b"\n"
+
+    # Starlette cancels the generator (and the Groq stream) if the client disconnects.
+    return StreamingResponse(
+        events(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # ==============================================================================
@@ -143,27 +270,105 @@ async def verify_text_endpoint(request: VerifyRequest):
 # Combines your Scraper Service with Groq Extraction.
 # ==============================================================================
 @app.post("/api/extract-claims")
-async def extract_claims_endpoint(request: ArticleRequest):
+async def extract_claims_endpoint(request: ArticleRequest, raw_request: Request):
     """
     1. Fetches HTML using scraper_service
     2. Uses Groq to extract verifiable claims
+    Both steps share one EXTRACT_DEADLINE_SECONDS budget.
+    """
+    async def work():
+        return ORJSONResponse(await _extract_claims(request.url))
+
+    return await run_until_disconnect(raw_request, work())
+
+async def _extract_claims(url: str, report=None) -> dict:
+    """
+    Shared by the synchronous endpoint and the job workers.
+    `report(stage, **partial)` (optional) publishes progress to job pollers.
     """
+    deadline = Deadline(EXTRACT_DEADLINE_SECONDS)
+
     # Step A: Fetch Content (Using your existing scraper code)
-    article_content, status_msg = await fetch_article_content(request.url)
+    if report: await report("scraping")
+    article_content, status_msg = await fetch_article_content(url, deadline=deadline)
     
     if not article_content:
+        # The JS attempt only gets part of the budget, so it can time out with time left.
+        if deadline.expired or status_msg.startswith(TIMED_OUT):
+            return {"claims": [], "timed_out": True, "detail": status_msg}
         raise HTTPException(status_code=424, detail=f"Scraper failed: {status_msg}")
 
     if len(article_content) < 100:
         raise HTTPException(status_code=400, detail="Article content too short to analyze.")
 
     # Step B: AI Extraction (Using new Groq Agent)
-    claims = await agent.isolate_claims(article_content)
-    
-    return {"claims": claims}
+    if report: await report("extracting", scraper_status=status_msg, article_chars=len(article_content))
+    try:
+        claims = await agent.isolate_claims(article_content, deadline=deadline)
+    except asyncio.TimeoutError:
+        # The LLM hit its cap (LLM_TIMEOUT) even if the overall deadline has time left.
+        return {"claims": [], "timed_out": True, "detail": "Claim extraction timed out."}
+
+    return {"claims": claims, "timed_out": not claims and deadline.expired}
+
+
+# ==============================================================================
+# FEATURE 3b: TIER 3 JOB MODE
+# POST returns a job ID at once; a bounded worker pool runs the scan from a
+# persistent SQLite queue (deduplicated on canonical URL). Clients poll or
+# long-poll the status endpoint.
+# ==============================================================================
+@app.post("/api/extract-claims/jobs", status_code=202)
+async def submit_extract_job(request: ArticleRequest):
+    """
+    Queues a Tier 3 scan. Returns {job_id, status, deduplicated}.
+    """
+    if not request.url:
+        raise HTTPException(status_code=400, detail="No URL provided")
+    # SQLite (BEGIN IMMEDIATE, up to the busy timeout) stays off the event loop.
+    try:
+        submitted = await asyncio.to_thread(job_queue.submit, request.url)
+    except sqlite3.Error as e:
+        print(f"⚠️ Job submit failed: {e}")
+        raise HTTPException(status_code=503, detail="Job queue busy, please retry.")
+    return ORJSONResponse(submitted, status_code=202)
+
+@app.get("/api/extract-claims/jobs/{job_id}")
+async def get_extract_job(job_id: str, wait: float = 0.0):
+    """
+    Job status. With ?wait=N the call long-polls up to N seconds
+    (capped at JOB_LONG_POLL_SECONDS) for the next status/stage change.
+    """
+    try:
+        if wait > 0:
+            job = await job_queue.wait(job_id, min(wait, JOB_LONG_POLL_SECONDS))
+        else:
+            job = await asyncio.to_thread(job_queue.get, job_id)
+    except sqlite3.Error as e:
+        print(f"⚠️ Job status read failed: {e}")
+        raise HTTPException(status_code=503, detail="Job queue busy, please retry.")
+
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return ORJSONResponse(job)
+
+@app.get("/api/extract-claims/jobs")
+async def extract_job_stats():
+    """
+    Queue depth, wait time and worker utilization.
+    """
+    return ORJSONResponse(await asyncio.to_thread(job_queue.stats))
 
 
 if __name__ == "__main__":
     port = int(os.environ.get('PORT', 8000))
-    # reload=False is safer for async loops in production
-    uvicorn.run(app, host="0.0.0.0", port=port, reload=False)
\ No newline at end of file
+    # reload=False is safer for async loops in production.
+    # Multiple workers need the app as an import string so each process can load it.
+    uvicorn.run(
+        "main:app" if WORKERS > 1 else app,
+        host="0.0.0.0",
+        port=port,
+        reload=False,
+        workers=WORKERS,
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_SECONDS,
+    )
\ No newline at end of file
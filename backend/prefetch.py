@@ -0,0 +1,172 @@
+import re
+import time
+import asyncio
+from decouple import config
+from typing import Awaitable, Callable, Dict, Optional, Set
+from shared_cache import shared_cache, normalize_key
+from upstream import executor_stats, tavily_breaker
+
+# --- CONFIGURATION ---
+# Opt-in: every Tier-1 search query costs a Tavily call that may never be used.
+PREFETCH_ENABLED = config("PREFETCH_ENABLED", default=False, cast=bool)
+PREFETCH_TTL = config("PREFETCH_TTL", default=600, cast=int)                     # Seconds a prefetch stays usable
+PREFETCH_MIN_INTERVAL = config("PREFETCH_MIN_INTERVAL", default=2.0, cast=float)  # Per-process rate limit
+PREFETCH_MAX_INFLIGHT = config("PREFETCH_MAX_INFLIGHT", default=2, cast=int)
+# Low priority: only prefetch while most upstream threads are idle, so user
+# searches never queue behind (or get refused because of) speculative ones.
+PREFETCH_MAX_EXECUTOR_LOAD = config("PREFETCH_MAX_EXECUTOR_LOAD", default=0.5, cast=float)
+
+# A highlight is "related" to a prefetched query when the query covers most of
+# the highlight's own keywords. Scoring against the highlight (not the shorter
+# side) keeps a two-word query like "modi rally" from matching every claim
+# that happens to mention both words.
+RELATED_MIN_COVERAGE = 0.6
+RELATED_MIN_SHARED = 2
+
+_STOPWORDS = {
+    "the", "and", "for", "are", "was", "were", "has", "have", "had", "that", "this",
+    "with", "from", "into", "its", "not", "but", "who", "what", "when", "why", "how",
+    "did", "does", "will", "can", "all", "any", "his", "her", "their", "they", "you",
+    "fact", "check", "true", "fake", "news", "really", "claim",
+}
+
+
+def keywords(text: str) -> Set[str]:
+    return {w for w in re.findall(r"\w+", (text or "").lower()) if len(w) > 2 and w not in _STOPWORDS}
+
+
+def _coverage(highlight: Set[str], query: Set[str]) -> float:
+    """Share of the highlight's keywords that the query also contains."""
+    if not highlight or not query:
+        return 0.0
+    shared = len(highlight & query)
+    if shared < RELATED_MIN_SHARED:
+        return 0.0
+    return shared / len(highlight)
+
+
+# --- CONSUMER SIDE (called from the verifier) ---
+_counters = {"lookups": 0, "hits": 0}
+
+
+def find_prefetched_evidence(text: str) -> Optional[str]:
+    """
+    Returns evidence prefetched for a query related to `text`, or None.
+    Marks the prefetch as used so it isn't reported as wasted.
+    """
+    _counters["lookups"] += 1
+    wanted = keywords(text)
+    best, best_score = None, 0.0
+    for record in shared_cache.values("prefetch"):
+        score = _coverage(wanted, set(record["keywords"]))
+        if score > best_score:
+            best, best_score = record, score
+
+    if best is None or best_score < RELATED_MIN_COVERAGE:
+        return None
+
+    _counters["hits"] += 1
+    if not best["used"]:
+        remaining = int(best["expires_at"] - time.time())
+        if remaining > 0:
+            shared_cache.set("prefetch", normalize_key(best["query"]), {**best, "used": True}, ttl=remaining)
+    print(f"⚡ Prefetch hit (coverage {best_score:.2f}): {best['query']}")
+    return best["evidence"]
+
+
+# --- PRODUCER SIDE (called from Tier 1) ---
+class EvidencePrefetcher:
+    """
+    Low-priority background searches for Tier-1 queries. Work that can't start
+    right away is dropped rather than queued: a prefetch is only useful if it
+    lands before the user highlights something.
+    """
+
+    def __init__(self, search: Callable[[str], Awaitable[str]], enabled: bool = PREFETCH_ENABLED):
+        self.search = search
+        self.enabled = enabled
+        self._inflight: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._last_started = 0.0
+        self._counters: Dict[str, int] = {
+            "scheduled": 0, "duplicate": 0, "rate_limited": 0, "upstream_busy": 0, "empty": 0, "failed": 0,
+        }
+
+    def schedule(self, query: str) -> bool:
+        """
+        Fire-and-forget. Returns True if a prefetch was actually started.
+        """
+        if not self.enabled or not query or not keywords(query):
+            return False
+
+        key = normalize_key(query)
+        if key in self._inflight or shared_cache.get("prefetch", key) is not None:
+            self._counters["duplicate"] += 1
+            return False
+
+        now = time.monotonic()
+        if len(self._inflight) >= PREFETCH_MAX_INFLIGHT or now - self._last_started < PREFETCH_MIN_INTERVAL:
+            self._counters["rate_limited"] += 1
+            return False
+
+        # Busy pool, or a Tavily breaker that isn't healthy (a half-open probe
+        # belongs to user traffic): drop the prefetch.
+        executor = executor_stats()
+        if executor["pending"] >= executor["threads"] * PREFETCH_MAX_EXECUTOR_LOAD or tavily_breaker.state != "closed":
+            self._counters["upstream_busy"] += 1
+            return False
+
+        self._last_started = now
+        self._inflight.add(key)
+        self._counters["scheduled"] += 1
+        task = asyncio.create_task(self._run(query, key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _run(self, query: str, key: str):
+        try:
+            print(f"🔮 Prefetching evidence: {query}")
+            evidence = await self.search(query)
+            if not evidence:
+                self._counters["empty"] += 1
+                return
+            shared_cache.set("prefetch", key, {
+                "query": query,
+                "keywords": sorted(keywords(query)),
+                "evidence": evidence,
+                "used": False,
+                "expires_at": time.time() + PREFETCH_TTL,
+            }, ttl=PREFETCH_TTL)
+        except Exception as e:
+            self._counters["failed"] += 1
+            print(f"⚠️ Prefetch failed: {e}")
+        finally:
+            self._inflight.discard(key)
+
+    async def stop(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Hit rate is per process; used/wasted come from the shared records
+        (wasted = expired without ever serving a verify).
+        """
+        now = time.time()
+        records = shared_cache.values("prefetch", limit=1000, include_expired=True)
+        used = sum(1 for r in records if r["used"])
+        wasted = sum(1 for r in records if not r["used"] and r["expires_at"] < now)
+        lookups = _counters["lookups"]
+        return {
+            "enabled": self.enabled,
+            **self._counters,
+            "inflight": len(self._inflight),
+            "lookups": lookups,
+            "hits": _counters["hits"],
+            "hit_rate": round(_counters["hits"] / lookups, 3) if lookups else 0.0,
+            "stored": len(records),
+            "used": used,
+            "wasted": wasted,
+        }
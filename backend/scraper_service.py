@@ -2,10 +2,15 @@ import httpx
 import re  # <--- Built-in Python library (No install needed)
 from decouple import config
 from typing import Optional, Tuple
+from shared_cache import shared_cache
+from deadlines import Deadline, stage_timeout
+from upstream import scraper_breaker, CircuitOpenError
 
 # --- Configuration ---
 SCRAPING_API_KEY = config('SCRAPING_API_KEY')
 SCRAPING_BASE_URL = config('SCRAPING_BASE_URL', default='https://api.scraperapi.com/')
+# Status prefix when an attempt was cut off by the caller's deadline (not a scraper failure).
+TIMED_OUT = "Timed out"
 
 # --- Helper: Lightweight HTML Cleaner ---
 def quick_clean_html(raw_html: str) -> str:
@@ -27,11 +32,34 @@ def quick_clean_html(raw_html: str) -> str:
     
     return clean_text
 
+# --- Helper: ScraperAPI call behind its circuit breaker ---
+async def _scraper_get(client: httpx.AsyncClient, params: dict, timeout: float) -> httpx.Response:
+    """
+    5xx/429 from ScraperAPI count as upstream failures; 4xx (target site
+    blocked us) don't, since ScraperAPI itself is healthy.
+    """
+    async def attempt():
+        response = await client.get(SCRAPING_BASE_URL, params=params, timeout=timeout)
+        if response.status_code >= 500 or response.status_code == 429:
+            response.raise_for_status()
+        return response
+
+    return await scraper_breaker.call(attempt, timeout=timeout)
+
 # --- Core Scraping Service ---
-async def fetch_article_content(url: str) -> Tuple[Optional[str], str]:
+async def fetch_article_content(url: str, deadline: Optional[Deadline] = None) -> Tuple[Optional[str], str]:
+    """
+    Fast scrape first, JS rendering as fallback. With a `deadline`, each attempt
+    only gets a share of the remaining budget (capped at its usual timeout).
+    """
     if SCRAPING_API_KEY == 'YOUR_SCRAPING_SERVICE_API_KEY':
         return None, "Error: Scraping API key is not configured."
 
+    cached = shared_cache.get("article", url)
+    if cached is not None:
+        print(f"⚡ Article cache hit: {url}")
+        return cached, "Success: Retrieved from shared cache."
+
     async with httpx.AsyncClient() as client:
         
         # --- ATTEMPT 1: FAST MODE (Render = False) ---
@@ -45,7 +73,9 @@ async def fetch_article_content(url: str) -> Tuple[Optional[str], str]:
         }
         
         try:
-            response = await client.get(SCRAPING_BASE_URL, params=fast_payload, timeout=15.0)
+            # Leave room for the JS fallback and the LLM afterwards.
+            fast_timeout = stage_timeout(deadline, 0.3, 15.0)
+            response = await _scraper_get(client, fast_payload, fast_timeout)
             if response.status_code == 200:
                 raw_html = response.text
                 cleaned_text = quick_clean_html(raw_html)
@@ -53,33 +83,49 @@ async def fetch_article_content(url: str) -> Tuple[Optional[str], str]:
                 # Validation: Did we actually get the article?
                 if len(cleaned_text) > 600:
                     print("✅ Fast Scrape Success!")
+                    shared_cache.set("article", url, cleaned_text)
                     return cleaned_text, "Success: Retrieved via Fast Mode."
                 else:
                     print(f"⚠️ Fast scrape too short ({len(cleaned_text)} chars). Retrying with JS...")
             
+        except CircuitOpenError:
+            return None, "Scraper temporarily unavailable (circuit open)."
         except Exception as e:
             print(f"⚠️ Fast scrape failed: {e}. Retrying...")
 
         # --- ATTEMPT 2: SLOW MODE (Fallback if Fast Mode failed) ---
         # This takes 15-20 seconds, but guarantees it works for tricky sites.
+        if deadline and deadline.expired:
+            return None, f"{TIMED_OUT}: no budget left for JS rendering."
+
         print("🐢 Falling back to JS Rendering...")
+        slow_timeout = stage_timeout(deadline, 0.7, 60.0)
         slow_payload = {
             'api_key': SCRAPING_API_KEY,
             'url': url,
             'render': 'true',   # <--- The "Heavy" Fix
-            'timeout': 60.0
+            'timeout': slow_timeout
         }
         
         try:
-            response = await client.get(SCRAPING_BASE_URL, params=slow_payload, timeout=60.0)
+            response = await _scraper_get(client, slow_payload, slow_timeout)
             response.raise_for_status()
             
             raw_html = response.text
             cleaned_text = quick_clean_html(raw_html)
+            if cleaned_text:
+                shared_cache.set("article", url, cleaned_text)
             
             return cleaned_text, "Success: Content retrieved (JS Mode)."
 
         except httpx.HTTPStatusError as e:
             return None, f"HTTP Error {e.response.status_code}: Scraper blocked."
+        except httpx.TimeoutException:
+            if deadline:
+                # Only had its share of the deadline; the caller still has time to answer.
+                return None, f"{TIMED_OUT} after {slow_timeout:.1f}s (JS Mode)."
+            return None, f"Request Error: JS Mode timed out after {slow_timeout:.1f}s."
+        except CircuitOpenError:
+            return None, "Scraper temporarily unavailable (circuit open)."
         except Exception as e:
             return None, f"Request Error: {e}"
\ No newline at end of file
@@ -0,0 +1,196 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from decouple import config
+from typing import Any, Dict, List, Optional
+
+# --- CONFIGURATION ---
+# One SQLite file shared by every uvicorn worker. WAL mode lets all workers
+# read concurrently while a single writer appends, so a verdict cached by
+# worker A is a hit for worker B on the very next request.
+CACHE_PATH = config(
+    "CACHE_PATH",
+    default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "credible_cache.db"),
+)
+
+# TTLs (seconds) per namespace. News moves fast, so nothing lives forever.
+CACHE_TTLS = {
+    "verdict": config("CACHE_TTL_VERDICT", default=6 * 3600, cast=int),
+    "evidence": config("CACHE_TTL_EVIDENCE", default=6 * 3600, cast=int),
+    "article": config("CACHE_TTL_ARTICLE", default=3600, cast=int),
+    # Claims extracted per article fingerprint (fingerprint.py)
+    "claims": config("CACHE_TTL_CLAIMS", default=6 * 3600, cast=int),
+    # Bare fingerprints of the "claims" entries, scanned for near-duplicates
+    "claims_index": config("CACHE_TTL_CLAIMS", default=6 * 3600, cast=int),
+}
+DEFAULT_TTL = 3600
+# How long a get/set may wait for another worker's write lock. These run on the
+# event loop, so a locked database is a miss (or a skipped write), not a stall.
+CACHE_BUSY_TIMEOUT = config("CACHE_BUSY_TIMEOUT", default=0.1, cast=float)
+
+
+def normalize_key(text: str) -> str:
+    """
+    Case/whitespace-insensitive key so "Modi  said X" and "modi said x" share an entry.
+    """
+    return " ".join((text or "").lower().split())
+
+
+# --- THE CACHE CLASS ---
+class SharedCache:
+    """
+    Cross-process key/value cache backed by SQLite (WAL mode).
+    Values are stored as JSON. Every process (worker) opens its own connection
+    lazily, so the object is safe to create at import time before uvicorn forks.
+    """
+
+    def __init__(self, path: str = CACHE_PATH):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        # Per-process counters: {namespace: {"hits": n, "misses": n}}
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._errors = {"read": 0, "write": 0}
+
+    def _connection(self) -> sqlite3.Connection:
+        # Re-open after a fork: SQLite handles must never cross processes.
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=CACHE_BUSY_TIMEOUT, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            # Newest-first scans by namespace (values()) without a temp sort.
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_recent ON cache (namespace, expires_at)")
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    @staticmethod
+    def _digest(key: str) -> str:
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _count(self, namespace: str, field: str):
+        bucket = self._counters.setdefault(namespace, {"hits": 0, "misses": 0})
+        bucket[field] += 1
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """
+        Returns the cached value, or None on a miss/expiry/DB error.
+        """
+        try:
+            with self._lock:
+                row = self._connection().execute(
+                    "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                    (namespace, self._digest(key)),
+                ).fetchone()
+        except sqlite3.Error as e:
+            self._errors["read"] += 1
+            print(f"⚠️ Cache read failed: {e}")
+            row = None
+
+        if row is None or row[1] < time.time():
+            self._count(namespace, "misses")
+            return None
+
+        self._count(namespace, "hits")
+        return json.loads(row[0])
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[int] = None):
+        """
+        Stores a JSON-serializable value. Failures are logged, never raised:
+        a broken cache must not break a fact-check.
+        """
+        ttl = ttl if ttl is not None else CACHE_TTLS.get(namespace, DEFAULT_TTL)
+        try:
+            with self._lock:
+                conn = self._connection()
+                try:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                        (namespace, self._digest(key), json.dumps(value), time.time() + ttl),
+                    )
+                    conn.commit()
+                except sqlite3.Error:
+                    conn.rollback()  # Don't leave the implicit transaction open
+                    raise
+        except sqlite3.Error as e:
+            # Usually "database is locked" past CACHE_BUSY_TIMEOUT; the next request re-caches.
+            self._errors["write"] += 1
+            print(f"⚠️ Cache write skipped: {e}")
+
+    def values(self, namespace: str, limit: int = 200, include_expired: bool = False) -> List[Any]:
+        """
+        Most recently written values in a namespace (newest first). Used where a
+        lookup is by similarity rather than exact key, e.g. prefetched evidence.
+        """
+        sql = "SELECT value FROM cache WHERE namespace = ?"
+        params: tuple = (namespace,)
+        if not include_expired:
+            sql += " AND expires_at >= ?"
+            params += (time.time(),)
+        sql += " ORDER BY expires_at DESC LIMIT ?"
+        params += (limit,)
+        try:
+            with self._lock:
+                rows = self._connection().execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            print(f"⚠️ Cache scan failed: {e}")
+            return []
+        return [json.loads(row[0]) for row in rows]
+
+    def purge_expired(self) -> int:
+        """
+        Deletes expired rows. Returns how many were removed.
+        """
+        try:
+            with self._lock:
+                conn = self._connection()
+                cursor = conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+                conn.commit()
+                return cursor.rowcount
+        except sqlite3.Error as e:
+            print(f"⚠️ Cache purge failed: {e}")
+            return 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit/miss counters for this worker plus the shared entry count.
+        """
+        try:
+            with self._lock:
+                entries = self._connection().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        except sqlite3.Error:
+            entries = None
+
+        namespaces = {}
+        for namespace, bucket in self._counters.items():
+            total = bucket["hits"] + bucket["misses"]
+            namespaces[namespace] = {
+                **bucket,
+                "hit_rate": round(bucket["hits"] / total, 3) if total else 0.0,
+            }
+        return {"pid": os.getpid(), "entries": entries, "namespaces": namespaces, "errors": dict(self._errors)}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+            self._pid = None
+
+
+# Module-level singleton: main.py, agentic_verifier.py and scraper_service.py
+# all import this, so each worker process holds exactly one connection.
+shared_cache = SharedCache()
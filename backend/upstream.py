@@ -0,0 +1,211 @@
+import time
+import asyncio
+import functools
+import threading
+import httpx
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from decouple import config
+from typing import Any, Awaitable, Callable, Dict, Optional
+from groq import APITimeoutError
+
+# --- CONFIGURATION ---
+BREAKER_WINDOW = config("BREAKER_WINDOW", default=20, cast=int)              # Calls remembered per upstream
+BREAKER_MIN_CALLS = config("BREAKER_MIN_CALLS", default=5, cast=int)         # Don't judge on fewer than this
+BREAKER_FAILURE_RATE = config("BREAKER_FAILURE_RATE", default=0.5, cast=float)  # Failed-or-slow share that trips it
+BREAKER_OPEN_SECONDS = config("BREAKER_OPEN_SECONDS", default=30.0, cast=float)  # Cool-off before a probe
+
+# Threads for blocking SDK calls (Tavily). Kept apart from asyncio's default
+# executor so a slow upstream can't starve everything else that uses it.
+UPSTREAM_THREADS = config("UPSTREAM_THREADS", default=8, cast=int)
+UPSTREAM_MAX_PENDING = config("UPSTREAM_MAX_PENDING", default=32, cast=int)
+
+
+# What a timed-out upstream call raises, depending on which layer gave up first.
+TIMEOUT_ERRORS = (asyncio.TimeoutError, httpx.TimeoutException, APITimeoutError)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose breaker is open."""
+
+
+class ExecutorSaturatedError(Exception):
+    """Raised when the upstream executor already has too much queued work."""
+
+
+# --- CIRCUIT BREAKER ---
+class CircuitBreaker:
+    """
+    closed -> open when, over the last BREAKER_WINDOW calls, the share of calls
+    that failed OR took longer than `slow_call_seconds` reaches the threshold.
+    open -> half_open after `open_seconds`; exactly one probe call is let through.
+    half_open -> closed if the probe is fast and succeeds, otherwise back to open.
+    """
+
+    def __init__(self, name: str, slow_call_seconds: float,
+                 failure_rate: float = BREAKER_FAILURE_RATE,
+                 open_seconds: float = BREAKER_OPEN_SECONDS,
+                 window: int = BREAKER_WINDOW,
+                 min_calls: int = BREAKER_MIN_CALLS):
+        self.name = name
+        self.slow_call_seconds = slow_call_seconds
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.min_calls = min_calls
+        self.state = "closed"
+        self._outcomes = deque(maxlen=window)  # True = bad (failed or slow)
+        self._opened_at = 0.0
+        self._probe_inflight = False
+        self._counters = {"calls": 0, "failures": 0, "slow": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls would be rejected outright (open, not yet due for a probe)."""
+        return self.state == "open" and time.monotonic() - self._opened_at < self.open_seconds
+
+    def allow(self) -> bool:
+        if self.state == "open" and time.monotonic() - self._opened_at >= self.open_seconds:
+            self.state = "half_open"
+            self._probe_inflight = False
+
+        if self.state == "closed":
+            return True
+        if self.state == "half_open" and not self._probe_inflight:
+            self._probe_inflight = True
+            return True
+
+        self._counters["rejected"] += 1
+        return False
+
+    def _open(self):
+        if self.state != "open":
+            self._counters["opened"] += 1
+            print(f"🔌 Circuit '{self.name}' OPEN for {self.open_seconds:.0f}s.")
+        self.state = "open"
+        self._opened_at = time.monotonic()
+        self._probe_inflight = False
+
+    def record(self, success: bool, duration: float):
+        slow = duration > self.slow_call_seconds
+        self._counters["calls"] += 1
+        self._counters["failures"] += 0 if success else 1
+        self._counters["slow"] += 1 if slow else 0
+        bad = slow or not success
+
+        if self.state == "half_open":
+            if bad:
+                self._open()
+            else:
+                print(f"🔌 Circuit '{self.name}' closed again.")
+                self.state = "closed"
+                self._outcomes.clear()
+                self._probe_inflight = False
+            return
+
+        self._outcomes.append(bad)
+        if len(self._outcomes) >= self.min_calls:
+            if sum(self._outcomes) / len(self._outcomes) >= self.failure_rate:
+                self._open()
+
+    async def call(self, make_call: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        """
+        Runs `make_call()` behind the breaker. Raises CircuitOpenError without
+        calling it when open. Cancellation (client went away) and a full local
+        executor aren't held against the upstream; nor is a timeout when the
+        call was only allowed `timeout` seconds, less than `slow_call_seconds`
+        (a tight deadline share says nothing about the upstream's health).
+        """
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+
+        started = time.monotonic()
+        try:
+            result = await make_call()
+        except BaseException as e:
+            self.record_outcome(e, time.monotonic() - started, timeout)
+            raise
+        self.record_outcome(None, time.monotonic() - started, timeout)
+        return result
+
+    def record_outcome(self, error: Optional[BaseException], duration: float, timeout: Optional[float] = None):
+        """
+        Records a call made after allow() (call() does both). For work that
+        isn't one awaitable, e.g. reading a whole token stream. `error` is
+        what the call raised, or None on success.
+        """
+        if error is None:
+            self.record(True, duration)
+            return
+        # The upstream was never (fully) asked, or only given a deadline share:
+        # free the probe slot, record nothing.
+        skipped = isinstance(error, (asyncio.CancelledError, GeneratorExit, ExecutorSaturatedError)) or (
+            isinstance(error, TIMEOUT_ERRORS) and timeout is not None and timeout < self.slow_call_seconds
+        )
+        if skipped:
+            self._probe_inflight = False
+            return
+        self.record(False, duration)
+
+    def snapshot(self) -> Dict[str, Any]:
+        window = len(self._outcomes)
+        return {
+            "state": self.state,
+            "bad_rate": round(sum(self._outcomes) / window, 3) if window else 0.0,
+            "window": window,
+            "slow_call_seconds": self.slow_call_seconds,
+            "open_for_seconds": (
+                round(max(0.0, self.open_seconds - (time.monotonic() - self._opened_at)), 1)
+                if self.state == "open" else 0.0
+            ),
+            **self._counters,
+        }
+
+
+# One breaker per upstream (per process). Slow thresholds sit well below the
+# hard timeouts so a degrading service trips the breaker before users notice.
+groq_breaker = CircuitBreaker("groq", slow_call_seconds=config("BREAKER_SLOW_GROQ", default=20.0, cast=float))
+tavily_breaker = CircuitBreaker("tavily", slow_call_seconds=config("BREAKER_SLOW_TAVILY", default=8.0, cast=float))
+scraper_breaker = CircuitBreaker("scraperapi", slow_call_seconds=config("BREAKER_SLOW_SCRAPER", default=30.0, cast=float))
+
+BREAKERS = {b.name: b for b in (groq_breaker, tavily_breaker, scraper_breaker)}
+
+
+def breaker_states() -> Dict[str, Any]:
+    return {name: breaker.snapshot() for name, breaker in BREAKERS.items()}
+
+
+# --- BOUNDED EXECUTOR ---
+_executor = ThreadPoolExecutor(max_workers=UPSTREAM_THREADS, thread_name_prefix="upstream")
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+def _release(_future):
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+
+
+async def run_blocking(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    asyncio.to_thread, but on the dedicated upstream pool and refusing work
+    once UPSTREAM_MAX_PENDING calls are queued or running. A call counts as
+    pending until its thread actually finishes, even if the caller gave up.
+    """
+    global _pending
+    with _pending_lock:
+        if _pending >= UPSTREAM_MAX_PENDING:
+            raise ExecutorSaturatedError(f"{_pending} upstream calls already pending")
+        _pending += 1
+
+    future = _executor.submit(functools.partial(fn, *args, **kwargs))
+    future.add_done_callback(_release)
+    return await asyncio.wrap_future(future)
+
+
+def executor_stats() -> Dict[str, Any]:
+    return {"threads": UPSTREAM_THREADS, "pending": _pending, "max_pending": UPSTREAM_MAX_PENDING}
+
+
+def shutdown_executor():
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -3,7 +3,116 @@
 
 // --- CONFIGURATION ---
 const VERIFY_ENDPOINT = "https://credible-factchecker.onrender.com/api/verify-text";
+const VERIFY_STREAM_ENDPOINT = `${VERIFY_ENDPOINT}/stream`;
+const STREAM_RENDER_INTERVAL_MS = 250;
 const EXTRACT_ENDPOINT = "https://credible-factchecker.onrender.com/api/extract-claims";
+const EXTRACT_JOBS_ENDPOINT = `${EXTRACT_ENDPOINT}/jobs`;
+const JOB_LONG_POLL_SECONDS = 20;
+// Give up on a scan after the server's extraction budget (EXTRACT_DEADLINE_SECONDS
+// in backend/deadlines.py) plus a generous wait in the queue.
+const EXTRACT_DEADLINE_SECONDS = 60;
+const JOB_MAX_QUEUE_SECONDS = 120;
+
+// Tier 2 streams NDJSON events: the verdict first, then the explanation as it
+// is written, then the full result. `onUpdate` gets a result-shaped object each
+// time there is something new worth rendering.
+async function streamVerification(text, onUpdate) {
+  const response = await fetch(VERIFY_STREAM_ENDPOINT, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ text: text })
+  });
+  if (!response.ok || !response.body) throw new Error("Server Error");
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = "";
+  let partial = null;
+  let lastRender = 0;
+  let claims = [];
+  const finished = [];
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffered += decoder.decode(value, { stream: true });
+
+    const lines = buffered.split("\n");
+    buffered = lines.pop();
+    for (const line of lines) {
+      if (!line.trim()) continue;
+      const event = JSON.parse(line);
+
+      if (event.event === "result") {
+        onUpdate(event);
+        return event;
+      }
+      if (event.event === "verdict") {
+        partial = { verdict: event.verdict, confidence_score: event.confidence_score, explanation: "", sources: [] };
+      } else if (partial && event.event === "explanation") {
+        partial.explanation += event.delta;
+      } else if (partial && event.event === "sources") {
+        partial.sources = event.sources;
+      } else if (event.event === "claims") {
+        claims = event.claims;
+        continue;
+      } else if (event.event === "claim") {
+        // Multi-sentence highlight: show a running tally until the aggregate arrives.
+        finished.push(event);
+        partial = claimTally(finished, claims.length);
+      } else {
+        continue;
+      }
+
+      const now = Date.now();
+      if (event.event !== "explanation" || now - lastRender >= STREAM_RENDER_INTERVAL_MS) {
+        lastRender = now;
+        onUpdate({ ...partial });
+      }
+    }
+  }
+  throw new Error("Connection closed before a result arrived");
+}
+
+function escapeHtml(text) {
+  return text.replace(/[&<>"']/g, (c) => ({ "&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;" }[c]));
+}
+
+// Result-shaped progress for a multi-sentence highlight.
+function claimTally(finished, total) {
+  const confidence = finished.reduce((sum, c) => sum + c.confidence_score, 0) / finished.length;
+  const lines = finished.map((c) => `<strong>${c.verdict}</strong>: "${escapeHtml(c.claim_text)}"`);
+  return {
+    verdict: `CHECKING ${finished.length}/${total || "?"}`,
+    confidence_score: confidence,
+    explanation: lines.join("<br>"),
+    sources: finished.flatMap((c) => c.sources).slice(0, 1)
+  };
+}
+
+// Tier 3 runs as a background job: submit, then long-poll until it finishes.
+// The server returns on every stage change, so each loop is one short request.
+async function runScanJob(url) {
+  const submit = await fetch(EXTRACT_JOBS_ENDPOINT, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ url: url })
+  });
+  if (!submit.ok) throw new Error("Server Error");
+  const { job_id } = await submit.json();
+
+  const giveUpAt = Date.now() + (EXTRACT_DEADLINE_SECONDS + JOB_MAX_QUEUE_SECONDS) * 1000;
+  while (Date.now() < giveUpAt) {
+    const wait = Math.max(1, Math.min(JOB_LONG_POLL_SECONDS, Math.ceil((giveUpAt - Date.now()) / 1000)));
+    const res = await fetch(`${EXTRACT_JOBS_ENDPOINT}/${job_id}?wait=${wait}`);
+    if (!res.ok) throw new Error("Server Error");
+    const job = await res.json();
+
+    if (job.status === "done") return job.result;
+    if (job.status === "failed") throw new Error(job.error || "Scan failed");
+  }
+  throw new Error("Scan is taking too long. Please try again later.");
+}
 
 // --- 1. SETUP CONTEXT MENU (Tier 2 Trigger) ---
 chrome.runtime.onInstalled.addListener(() => {
@@ -19,12 +128,7 @@ chrome.runtime.onMessage.addListener((request, sender, sendResponse) => {
   
   // CASE A: Tier 3 - "Scan Article" from Popup
   if (request.action === "SCAN_ARTICLE") {
-    fetch(EXTRACT_ENDPOINT, {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ url: request.url })
-    })
-    .then(res => res.json())
+    runScanJob(request.url)
     .then(data => {
       // Send result back to the Popup
       chrome.runtime.sendMessage({ action: "SCAN_RESULT", data: data });
@@ -62,21 +166,12 @@ chrome.contextMenus.onClicked.addListener(async (info, tab) => {
     });
 
     try {
-      // 2. Fetch from Backend (Bypassing CORS)
-      const response = await fetch(VERIFY_ENDPOINT, {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ text: info.selectionText })
-      });
-
-      if (!response.ok) throw new Error("Server Error");
-
-      const result = await response.json();
-
-      // 3. Send Success Result to content.js
-      chrome.tabs.sendMessage(tab.id, {
-        action: "UI_RESULT",
-        data: result
+      // 2. Stream from Backend (Bypassing CORS); 3. content.js re-renders on each update
+      await streamVerification(info.selectionText, (result) => {
+        chrome.tabs.sendMessage(tab.id, {
+          action: "UI_RESULT",
+          data: result
+        });
       });
 
     } catch (error) {